@@ -4,7 +4,9 @@ import logging
 import os
 from argparse import ArgumentDefaultsHelpFormatter
 
-from constants import ALL, COC, COCDEV, DEPCHECK, DYNAMIC, REPORTS, SCAN, SINGLE, STATIC, V10, V95
+from constants import (ALL, COC, COCDEV, DEPCHECK, DYNAMIC, PIPELINE_WORKERS, REPORTS, SCAN,
+                       SINGLE, STATIC, SUPPRESSION_FILE, SUPPRESSIONS, V10, V95, WATCH,
+                       WATCH_MAX_HOURS)
 from main_logger import main_logger
 
 
@@ -16,6 +18,28 @@ def str2bool(value):
     return value
 
 
+def positive_int(value):
+    """
+    Parse a strictly positive integer argument.
+
+    Args:
+        value ([str]): the value passed in
+
+    Raises:
+        argparse.ArgumentTypeError: the value is not a positive integer
+
+    Returns:
+        [int]: the value
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
 def add_optionals_args(parser):
     """
     Add optional arguments to the passed in argument parser.
@@ -78,6 +102,146 @@ def add_version_arg(parser, required=False):
     )
 
 
+def add_versions_arg(parser):
+    """
+    Add versions argument to the passed in argument parser.
+
+    Args:
+        parser ([ArgumentParser]): the argument parser
+    """
+    parser.add_argument(
+        "-vers",
+        "--versions",
+        dest="versions",
+        nargs="+",
+        choices=[SINGLE, COCDEV, COC, V95, V10],
+        help="versions from the app registry to run at the same time, overrides --version",
+        default=None,
+    )
+
+
+def add_shards_arg(parser, help_text):
+    """
+    Add shards argument to the passed in argument parser.
+
+    Args:
+        parser ([ArgumentParser]): the argument parser
+        help_text ([str]): what the shards are
+    """
+    parser.add_argument(
+        "-sh",
+        "--shards",
+        dest="shards",
+        type=positive_int,
+        default=1,
+        help=help_text,
+    )
+
+
+def add_profile_arg(parser):
+    """
+    Add profile argument to the passed in argument parser.
+
+    Args:
+        parser ([ArgumentParser]): the argument parser
+    """
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        help="record cProfile stats and top memory allocations of each stage next to the reports",
+    )
+
+
+def add_jobs_arg(parser):
+    """
+    Add jobs argument to the passed in argument parser.
+
+    Args:
+        parser ([ArgumentParser]): the argument parser
+    """
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=positive_int,
+        default=PIPELINE_WORKERS,
+        help="number of independent stages to run at the same time",
+    )
+
+
+def add_resume_arg(parser):
+    """
+    Add resume argument to the passed in argument parser.
+
+    Args:
+        parser ([ArgumentParser]): the argument parser
+    """
+    parser.add_argument(
+        "-r",
+        "--resume",
+        dest="resume",
+        action="store_true",
+        help="continue the interrupted static scan run from its journal, skipping the completed work",
+    )
+
+
+def add_project_logs_arg(parser):
+    """
+    Add project logs argument to the passed in argument parser.
+
+    Args:
+        parser ([ArgumentParser]): the argument parser
+    """
+    parser.add_argument(
+        "-pl",
+        "--project-logs",
+        dest="project_logs",
+        action="store_true",
+        help="also write the logs of each static scan project to its own file next to the reports",
+    )
+
+
+def add_watch_args(parser):
+    """
+    Add watch arguments to the passed in argument parser.
+
+    Args:
+        parser ([ArgumentParser]): the argument parser
+    """
+    parser.add_argument(
+        "-hr",
+        "--hours",
+        dest="hours",
+        type=float,
+        default=WATCH_MAX_HOURS,
+        help="stop watching after this many hours even if scans are still pending",
+    )
+
+
+def add_suppressions_args(parser):
+    """
+    Add suppressions arguments to the passed in argument parser.
+
+    Args:
+        parser ([ArgumentParser]): the argument parser
+    """
+    parser.add_argument(
+        "-i",
+        "--input",
+        dest="input",
+        help="the suppression file to check",
+        default=SUPPRESSION_FILE,
+    )
+    parser.add_argument(
+        "-m",
+        "--merged",
+        dest="merged",
+        help="if set, write the merged suppressions to this file",
+        default=None,
+    )
+
+
 def add_source_arg(parser, required=False):
     """
     Add source argument to the passed in argument parser.
@@ -132,18 +296,23 @@ def init_argparse():
             formatter_class=ArgumentDefaultsHelpFormatter,
             epilog="Have a nice day! :)",
         )
+        add_profile_arg(parser)
+        add_jobs_arg(parser)
 
         subparsers = parser.add_subparsers(
             title="mode", dest="mode", description="automator mode to run", required=True
         )
 
         # create subparsers
-        for mode in [SCAN, REPORTS, DEPCHECK]:
+        for mode in [SCAN, REPORTS, DEPCHECK, SUPPRESSIONS, WATCH]:
             mode_parser = subparsers.add_parser(mode)
             add_optionals_args(mode_parser)
             if mode == DEPCHECK:
                 add_version_arg(mode_parser)
                 add_output_arg(mode_parser)
+                add_shards_arg(mode_parser, "number of concurrent dependency check processes")
+            elif mode == SUPPRESSIONS:
+                add_suppressions_args(mode_parser)
             else:
                 mode_subparser = mode_parser.add_subparsers(
                     title="type", dest="type", description="type of scan to run", required=True
@@ -151,13 +320,22 @@ def init_argparse():
                 for scan_type in [ALL, STATIC, DYNAMIC]:
                     type_parser = mode_subparser.add_parser(scan_type)
                     add_optionals_args(type_parser)
+                    add_versions_arg(type_parser)
                     if mode == SCAN:
                         if scan_type in (ALL, STATIC):
                             add_source_arg(type_parser, required=True)
+                            add_resume_arg(type_parser)
+                            add_project_logs_arg(type_parser)
                         if scan_type in (ALL, DYNAMIC):
                             add_version_arg(type_parser)
-                    if mode == REPORTS:
+                            add_shards_arg(
+                                type_parser,
+                                "number of runtime containers to spread the dynamic scans over",
+                            )
+                    if mode in (REPORTS, WATCH):
                         add_output_arg(type_parser)
+                    if mode == WATCH:
+                        add_watch_args(type_parser)
         arguments = parser.parse_args()
     except argparse.ArgumentError as error:
         main_logger.error("Error parsing arguments")
@@ -7,7 +7,7 @@ import requests
 
 from constants import ASOC_API_ENDPOINT, PENDING_STATUSES, TIME_TO_SLEEP
 from main_logger import main_logger
-from utils import create_dir, download, f_logger, get_date_str, run_subprocess, timer
+from utils import create_dir, download, f_logger, get_reports_dir, run_subprocess, timer
 
 
 @timer
@@ -76,22 +76,23 @@ def get_download_config(name, report_file_type):
 
 @timer
 @f_logger
-def download_report(scan_type, report_data):
+def download_report(scan_type, report_data, version_tag=""):
     """
     Download the generated report.
 
     Args:
-        args ([dict]): the arguments passed to the script
-        report ([dict]): the report to download
+        scan_type ([str]): type of scan
+        report_data ([dict]): the report to download
+        version_tag ([str], optional): the version, empty for a single version run. Defaults to "".
     """
-    reports_dir_path = f"reports/{get_date_str()}/{scan_type}"
+    reports_dir_path = get_reports_dir(scan_type, version_tag=version_tag)
     create_dir(reports_dir_path)
     download(
         report_data["DownloadLink"],
         f"{report_data['Name']}.{report_data['ReportFileType']}",
         reports_dir_path,
     )
-    copy_tree(f"reports/{get_date_str()}/{scan_type}", f"reports/latest/{scan_type}")
+    copy_tree(reports_dir_path, get_reports_dir(scan_type, "latest", version_tag))
 
 
 @timer
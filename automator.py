@@ -1,19 +1,19 @@
 """ Automator """
 import csv
-import io
+import functools
 import json
 import os
 import pathlib
 import sys
 import tempfile
+import threading
 import time
 import traceback
-import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from distutils.dir_util import copy_tree
 from multiprocessing import Pool
 
-import pandas as pd
 import requests
 
 from asoc_utils import (
@@ -33,36 +33,84 @@ from constants import (
     APPSCAN_CONFIG_OP,
     ASOC_API_ENDPOINT,
     DEPCHECK,
-    DEPCHECK_REPO,
+    DEPCHECK_JAR_EXCLUDES,
+    DEPCHECK_REPORT,
     DEPCHECK_SCAN,
     DYNAMIC,
     HEADER_FIELDS,
     IAC_JAR,
     IAC_JAR_URL,
+    JOURNAL_CONFIG,
+    JOURNAL_IRX,
+    JOURNAL_OLD_SCANS_REMOVED,
+    JOURNAL_OPERATORS_CLONED,
+    JOURNAL_SCAN,
+    JOURNAL_SOURCE_BUILT,
+    JOURNAL_UPLOADED,
     MAX_TRIES,
     PADDING,
     PENDING_STATUSES,
+    PROJECT_LOGS,
     REPORT_FILE_TYPES,
     REPORTS,
-    RT_SCAN,
     SBA_JAR,
     SBA_JAR_URL,
     SCAN,
-    SINGLE_DYNAMIC,
     SINGLE_STATIC,
+    SMCFS_EAR_PATH,
     STATIC,
+    STATIC_OPERATORS,
+    SUPPRESSIONS,
+    WATCH,
+    WATCH_BACKOFF,
+    WATCH_MAX_INTERVAL,
+    WATCH_MIN_INTERVAL,
+    WATCH_TOKEN_REFRESH,
 )
-from docker_utils import cleanup_runtime_container, start_app_container, start_depcheck_container
+from depcheck_utils import (
+    download_depcheck_tool,
+    export_depcheck_results,
+    run_incremental_depcheck,
+    update_depcheck_data,
+    write_depcheck_html,
+)
+from docker_utils import (
+    cleanup_runtime_container,
+    enforce_image_retention,
+    extract_jars_from_container,
+    remove_container,
+    start_app_container,
+    start_depcheck_container,
+    start_image_pull,
+    wait_for_image_pull,
+)
+from journal_utils import RunJournal
+from log_utils import init_worker_logging, queue_logging, set_log_project, set_log_version
 from main_logger import main_logger
+from pipeline_utils import Pipeline
+from profile_utils import profile_stage
+from registry_utils import get_version_image, get_versions_args
+from suppression_utils import (
+    apply_suppressions,
+    get_suppression_issues,
+    load_suppressions,
+    merge_suppressions,
+    write_suppressions,
+)
+from trace_utils import bind_span, current_span_id, export_trace, start_tracing, trace_span
 from utils import (
     create_dir,
     download,
     f_logger,
     get_date_str,
     get_latest_image,
+    get_reports_dir,
+    merge_task_timings,
     parse_arguments,
     run_subprocess,
+    run_timed_task,
     timer,
+    timing_collector,
     update_config_file,
     upload_reports_to_artifactory,
 )
@@ -73,15 +121,18 @@ from utils import (
 # ********************************* #
 @timer
 @f_logger
-def get_projects():
+def get_projects(path="projects.list"):
     """
     Get the list of projects to scan.
 
+    Args:
+        path (str, optional): the projects file. Defaults to "projects.list".
+
     Returns:
         [list]: list of the oms projects to scan
     """
     projects = []
-    with open("projects.list", "r") as file:
+    with open(path, "r") as file:
         projects = file.readlines()
     return projects
 
@@ -99,6 +150,22 @@ def build_source_code(args):
     run_subprocess(f'cd {args.source} && find . -name "*.irx" -type f -delete')
 
 
+def get_static_config_path(args, project_file_name, suffix="tmp"):
+    """
+    Get the path of the appscan config of a project. The configs are kept in
+    the work dir of the run, so versions running together do not share them.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+        project_file_name ([str]): the project file name
+        suffix (str, optional): the config file suffix. Defaults to "tmp".
+
+    Returns:
+        [str]: the config path
+    """
+    return f"{args.work_dir}/appscan-config-{project_file_name}-{suffix}.xml"
+
+
 def generate_appscan_config_file(args, project, project_file_name):
     """
     Generate appscan config file.
@@ -110,43 +177,55 @@ def generate_appscan_config_file(args, project, project_file_name):
     with open(APPSCAN_CONFIG) as reader:
         text = reader.read().replace("PROJECT_PATH", f"{args.source_working}/{project.strip()}")
     if project == "afc.product/platform_afc":
-        with open(f"appscan-config-{project_file_name}-afc.xml", "w") as writer:
+        with open(get_static_config_path(args, project_file_name, "afc"), "w") as writer:
             writer.write(text)
     else:
-        with open(f"appscan-config-{project_file_name}-tmp.xml", "w") as writer:
+        with open(get_static_config_path(args, project_file_name), "w") as writer:
             writer.write(text)
 
 
 def call_asoc_apis_to_create_scan(
-    file_req_header, project, project_file_name, tmpdir, asoc_headers
+    file_req_header,
+    project,
+    project_file_name,
+    tmpdir,
+    asoc_headers,
+    journal=None,
+    app_id=SINGLE_STATIC,
 ):
     """
-    Call AppScan API to create the static scan
+    Call AppScan API to create the static scan. With a journal, the uploaded
+    file id and the created scan id are recorded, and an upload recorded by
+    an interrupted run is reused.
 
     Args:
         file_req_header: request header
         project: project name
         project_file_name: project file name for uploading
         tmpdir: temporary directory
+        journal: run journal. Defaults to None.
+        app_id: the static application. Defaults to SINGLE_STATIC.
     """
     try:
         main_logger.info(f"Calling ASoC API to create the static scan for {project}...")
 
-        with open(f"{tmpdir}/{project_file_name}.irx", "rb") as irx_file:
-            file_data = {"fileToUpload": irx_file}
-            finished = False
-            try_count = 0
-            while not finished:
-                if try_count >= MAX_TRIES:
-                    break
-                try_count += 1
-                main_logger.info(f"TRYING #{try_count} OF {MAX_TRIES}...")
+        uploaded = journal.get(JOURNAL_UPLOADED, project) if journal else None
+        file_id = uploaded["file_id"] if uploaded else None
+        finished = False
+        try_count = 0
+        while not finished:
+            if try_count >= MAX_TRIES:
+                break
+            try_count += 1
+            main_logger.info(f"TRYING #{try_count} OF {MAX_TRIES}...")
+            if file_id is None:
                 try:
-                    file_upload_res = requests.post(
-                        f"{ASOC_API_ENDPOINT}/FileUpload",
-                        files=file_data,
-                        headers=file_req_header,
-                    )
+                    with open(f"{tmpdir}/{project_file_name}.irx", "rb") as irx_file:
+                        file_upload_res = requests.post(
+                            f"{ASOC_API_ENDPOINT}/FileUpload",
+                            files={"fileToUpload": irx_file},
+                            headers=file_req_header,
+                        )
                     main_logger.info(f"File Upload Response: {file_upload_res}")
                     main_logger.info(file_upload_res.json())
                 except Exception as error:
@@ -166,85 +245,166 @@ def call_asoc_apis_to_create_scan(
                     main_logger.info(f"New bearer token {file_req_header}")
                     continue
 
-                if file_upload_res.status_code == 201:
-                    data = {
-                        "ARSAFileId": file_upload_res.json()["FileId"],
-                        "ScanName": project,
-                        "AppId": SINGLE_STATIC,
-                        "Locale": "en",
-                        "Execute": True,
-                        "Personal": False,
-                    }
-
-                    # payload
-                    main_logger.info(f"Payload: \n{data}\n")
-
-                    res = requests.post(
-                        f"{ASOC_API_ENDPOINT}/Scans/StaticAnalyzer",
-                        json=data,
-                        headers=asoc_headers,
-                    )
-                    if res.status_code == 401:
-                        main_logger.info(
-                            f"Token {file_req_header} expired. Generating a new one and retry..."
-                        )
-                        file_req_header = {"Authorization": f"Bearer {get_bearer_token()}"}
-                        main_logger.info(f"New bearer token {file_req_header}")
-                        continue
-                finished = res.status_code == 201
-                main_logger.info(f"Response: {res.json()}")
-            main_logger.info(
-                f"PROJECT: {project} - {project_file_name} WAS PROCESSED SUCCESSFULLY.\n"
+                if file_upload_res.status_code != 201:
+                    continue
+                file_id = file_upload_res.json()["FileId"]
+                if journal:
+                    journal.record(JOURNAL_UPLOADED, project, file_id=file_id)
+            else:
+                main_logger.info(f"Reusing the uploaded file {file_id}")
+
+            data = {
+                "ARSAFileId": file_id,
+                "ScanName": project,
+                "AppId": app_id,
+                "Locale": "en",
+                "Execute": True,
+                "Personal": False,
+            }
+
+            # payload
+            main_logger.info(f"Payload: \n{data}\n")
+
+            res = requests.post(
+                f"{ASOC_API_ENDPOINT}/Scans/StaticAnalyzer",
+                json=data,
+                headers=asoc_headers,
             )
+            if res.status_code == 401:
+                main_logger.info(
+                    f"Token {file_req_header} expired. Generating a new one and retry..."
+                )
+                file_req_header = {"Authorization": f"Bearer {get_bearer_token()}"}
+                main_logger.info(f"New bearer token {file_req_header}")
+                continue
+            finished = res.status_code == 201
+            main_logger.info(f"Response: {res.json()}")
+            if finished and journal:
+                journal.record(JOURNAL_SCAN, project, file_id=file_id, scan_id=res.json()["Id"])
+            elif not finished:
+                # upload again, the file may not be usable anymore
+                file_id = None
+        main_logger.info(
+            f"PROJECT: {project} - {project_file_name} WAS PROCESSED SUCCESSFULLY.\n"
+        )
     except Exception as error:
         main_logger.warning(traceback.format_exc())
         main_logger.warning(error)
 
 
-def create_static_scan_operators(args, file_req_header):
-    run_subprocess(
-        f"cd {args.workspace} && mkdir -p {args.workspace}/operators && rm -rf {args.workspace}/operators/*"
-    )
-    # clone OMS operators
-    run_subprocess(
-        f"git clone git@github.ibm.com:Order-Management-Fulfillment/ibm-oms-operator.git {args.workspace}/operators/ibm-oms-operator"
-    )
+def prepare_and_create_static_scan(
+    args, project, project_file_name, irx_dir, render_config, file_req_header, journal=None
+):
+    """
+    Render the appscan config, prepare the irx file and create the static scan
+    of a project. The stages the journal has as completed are skipped.
 
-    # clone JWT verifier operator
-    run_subprocess(
-        f"git clone git@github.ibm.com:cmus/ibm-jwt-verifier-operator.git {args.workspace}/operators/ibm-jwt-verifier-operator"
+    Args:
+        args ([dict]): the arguments passed to the script
+        project ([str]): the project name
+        project_file_name ([str]): the project file name
+        irx_dir ([str]): directory to prepare the irx file in
+        render_config ([func]): writes the config at get_static_config_path
+        file_req_header ([dict]): request header
+        journal ([RunJournal], optional): run journal. Defaults to None.
+    """
+    if journal and journal.get(JOURNAL_SCAN, project):
+        main_logger.info(f"{project}: the scan was already created, skipping")
+        return
+
+    irx_prepared = (
+        journal
+        and journal.get(JOURNAL_IRX, project)
+        and os.path.exists(f"{irx_dir}/{project_file_name}.irx")
     )
+    if irx_prepared:
+        main_logger.info(f"{project}: reusing {irx_dir}/{project_file_name}.irx")
+    else:
+        render_config()
+        if journal:
+            journal.record(JOURNAL_CONFIG, project)
 
-    # clone SIP operator
-    run_subprocess(
-        f"git clone git@github.ibm.com:cmus/ibm-sip-operator.git {args.workspace}/operators/ibm-sip-operator"
-    )
+        main_logger.info(f"Generating {project_file_name}.irx file...")
+        with trace_span(f"prepare {project}", category="prepare"):
+            run_subprocess(
+                f"source ~/.bashrc && appscan.sh prepare -c {get_static_config_path(args, project_file_name)} -n {project_file_name}.irx -d {irx_dir}"
+            )
+        if journal:
+            journal.record(JOURNAL_IRX, project, irx=f"{irx_dir}/{project_file_name}.irx")
 
-    # clone oms gateway
-    run_subprocess(
-        f"git clone git@github.ibm.com:cmus/oms-gateway.git {args.workspace}/operators/oms-gateway"
-    )
+    with trace_span(f"upload {project}", category="upload"):
+        call_asoc_apis_to_create_scan(
+            file_req_header,
+            project,
+            project_file_name,
+            irx_dir,
+            args.asoc_headers,
+            journal,
+            args.static_app_id,
+        )
 
-    operators = ["ibm-oms-operator", "ibm-jwt-verifier-operator", "ibm-sip-operator", "oms-gateway"]
-    for operator in operators:
-        main_logger.info(f"Generating appscan config file for {operator}...")
-        project_file_name = operator
-        with open(APPSCAN_CONFIG_OP) as reader:
-            text = reader.read().replace("PROJECT_PATH", f"{args.workspace}/operators/{operator}")
-        with open(f"appscan-config-{project_file_name}-tmp.xml", "w") as writer:
-            writer.write(text)
 
-        main_logger.info(f"Generating {project_file_name}.irx file...")
+def render_static_config(template, project_path, config_path):
+    """
+    Write the appscan config of a project from a template.
+
+    Args:
+        template ([str]): the config template
+        project_path ([str]): the path to scan
+        config_path ([str]): the config to write
+    """
+    with open(template) as reader:
+        text = reader.read().replace("PROJECT_PATH", project_path)
+    with open(config_path, "w") as writer:
+        writer.write(text)
+
+
+def create_static_scan_operators(args, file_req_header, journal=None):
+    if journal and all(journal.get(JOURNAL_SCAN, operator) for operator in STATIC_OPERATORS):
+        main_logger.info("The operator scans were already created, skipping")
+        return
+
+    if not (journal and journal.get(JOURNAL_OPERATORS_CLONED)):
+        run_subprocess(
+            f"cd {args.workspace} && mkdir -p {args.workspace}/operators && rm -rf {args.workspace}/operators/*"
+        )
+        # clone OMS operators
         run_subprocess(
-            f"source ~/.bashrc && appscan.sh prepare -c appscan-config-{project_file_name}-tmp.xml -n {project_file_name}.irx -d {args.workspace}/operators/{operator}"
+            f"git clone git@github.ibm.com:Order-Management-Fulfillment/ibm-oms-operator.git {args.workspace}/operators/ibm-oms-operator"
         )
 
-        call_asoc_apis_to_create_scan(
-            file_req_header,
+        # clone JWT verifier operator
+        run_subprocess(
+            f"git clone git@github.ibm.com:cmus/ibm-jwt-verifier-operator.git {args.workspace}/operators/ibm-jwt-verifier-operator"
+        )
+
+        # clone SIP operator
+        run_subprocess(
+            f"git clone git@github.ibm.com:cmus/ibm-sip-operator.git {args.workspace}/operators/ibm-sip-operator"
+        )
+
+        # clone oms gateway
+        run_subprocess(
+            f"git clone git@github.ibm.com:cmus/oms-gateway.git {args.workspace}/operators/oms-gateway"
+        )
+        if journal:
+            journal.record(JOURNAL_OPERATORS_CLONED)
+
+    for operator in STATIC_OPERATORS:
+        main_logger.info(f"Generating appscan config file for {operator}...")
+        prepare_and_create_static_scan(
+            args,
+            operator,
             operator,
-            project_file_name,
             f"{args.workspace}/operators/{operator}",
-            args.asoc_headers,
+            functools.partial(
+                render_static_config,
+                APPSCAN_CONFIG_OP,
+                f"{args.workspace}/operators/{operator}",
+                get_static_config_path(args, operator),
+            ),
+            file_req_header,
+            journal,
         )
 
 
@@ -274,165 +434,268 @@ def create_static_scan_operator(args, file_req_header):
     )
 
 
-def create_static_scan_sba(args, tmpdir, file_req_header):
+def download_and_render_config(jar_url, jar, jar_dir, config_path):
     """
-    Create static scan for sba project
+    Download the jar of a project and write its appscan config.
 
     Args:
-        tmpdir (str): temporary directory
+        jar_url ([str]): url of the jar
+        jar ([str]): the jar file name
+        jar_dir ([str]): directory to download the jar to
+        config_path ([str]): the config to write
     """
     main_logger.info("Create a temporary directory for the jar...")
-    pathlib.Path(f"{tmpdir}/SBA").mkdir(parents=True, exist_ok=True)
+    pathlib.Path(jar_dir).mkdir(parents=True, exist_ok=True)
 
-    main_logger.info(f"Downloading {SBA_JAR}...")
-    download(SBA_JAR_URL, SBA_JAR, f"{tmpdir}/SBA")
+    main_logger.info(f"Downloading {jar}...")
+    download(jar_url, jar, jar_dir)
 
     main_logger.info("Generating appscan config file...")
-    project_file_name = "sba"
-    with open(APPSCAN_CONFIG) as reader:
-        text = reader.read().replace("PROJECT_PATH", f"{tmpdir}/SBA")
-    with open(f"appscan-config-{project_file_name}-tmp.xml", "w") as writer:
-        writer.write(text)
+    render_static_config(APPSCAN_CONFIG, jar_dir, config_path)
 
-    main_logger.info(f"Generating {project_file_name}.irx file...")
-    run_subprocess(
-        f"source ~/.bashrc && appscan.sh prepare -c appscan-config-{project_file_name}-tmp.xml -n {project_file_name}.irx -d {tmpdir}/SBA"
-    )
 
-    call_asoc_apis_to_create_scan(
-        file_req_header, "sba", project_file_name, f"{tmpdir}/SBA", args.asoc_headers
+def create_static_scan_sba(args, tmpdir, file_req_header, journal=None):
+    """
+    Create static scan for sba project
+
+    Args:
+        tmpdir (str): temporary directory
+    """
+    prepare_and_create_static_scan(
+        args,
+        "sba",
+        "sba",
+        f"{tmpdir}/SBA",
+        functools.partial(
+            download_and_render_config,
+            SBA_JAR_URL,
+            SBA_JAR,
+            f"{tmpdir}/SBA",
+            get_static_config_path(args, "sba"),
+        ),
+        file_req_header,
+        journal,
     )
 
 
-def create_static_scan_iac(args, tmpdir, file_req_header):
+def create_static_scan_iac(args, tmpdir, file_req_header, journal=None):
     """
     Create static scan for IAC project
 
     Args:
         tmpdir (str): temporary directory
     """
-    main_logger.info("Create a temporary directory for the jar...")
-    pathlib.Path(f"{tmpdir}/IAC").mkdir(parents=True, exist_ok=True)
-
-    main_logger.info(f"Downloading {IAC_JAR}...")
-    download(IAC_JAR_URL, IAC_JAR, f"{tmpdir}/IAC")
-
-    main_logger.info("Generating appscan config file...")
-    project_file_name = "iac"
-    with open(APPSCAN_CONFIG) as reader:
-        text = reader.read().replace("PROJECT_PATH", f"{tmpdir}/IAC")
-    with open(f"appscan-config-{project_file_name}-tmp.xml", "w") as writer:
-        writer.write(text)
-
-    main_logger.info(f"Generating {project_file_name}.irx file...")
-    run_subprocess(
-        f"source ~/.bashrc && appscan.sh prepare -c appscan-config-{project_file_name}-tmp.xml -n {project_file_name}.irx -d {tmpdir}/IAC"
-    )
-
-    call_asoc_apis_to_create_scan(
-        file_req_header, "iac", project_file_name, f"{tmpdir}/IAC", args.asoc_headers
+    prepare_and_create_static_scan(
+        args,
+        "iac",
+        "iac",
+        f"{tmpdir}/IAC",
+        functools.partial(
+            download_and_render_config,
+            IAC_JAR_URL,
+            IAC_JAR,
+            f"{tmpdir}/IAC",
+            get_static_config_path(args, "iac"),
+        ),
+        file_req_header,
+        journal,
     )
 
 
-def create_static_scan(args, project, tmpdir, file_req_header):
+def create_static_scan(args, project, tmpdir, file_req_header, trace_parent=None, journal=None):
     """
-    Create static scan
+    Create static scan. Runs in a pool worker, trace_parent attaches its
+    spans to the static scan stage of the main process and its records are
+    tagged with the project for the per-project log files.
     """
     project = project.strip()
     project_file_name = project.strip().replace("/", "_")
-    print()
-    process_project_message = f"PROCESSING PROJECT: {project} - {project_file_name}"
-    main_logger.info("#" * (len(process_project_message) + PADDING))
-    main_logger.info(
-        " " * int((PADDING / 2)) + process_project_message + " " * int((PADDING / 2)),
-    )
-    main_logger.info("#" * (len(process_project_message) + PADDING))
-
-    # generate config file for appscan
-    generate_appscan_config_file(args, project, project_file_name)
-    main_logger.info(f"Generating {project_file_name}.irx file...")
-    run_subprocess(
-        f"source ~/.bashrc && appscan.sh prepare -c appscan-config-{project_file_name}-tmp.xml -n {project_file_name}.irx -d {tmpdir}"
-    )
+    set_log_project(project_file_name)
+    with trace_span(f"project {project}", category="project", parent=trace_parent):
+        print()
+        process_project_message = f"PROCESSING PROJECT: {project} - {project_file_name}"
+        main_logger.info("#" * (len(process_project_message) + PADDING))
+        main_logger.info(
+            " " * int((PADDING / 2)) + process_project_message + " " * int((PADDING / 2)),
+        )
+        main_logger.info("#" * (len(process_project_message) + PADDING))
 
-    call_asoc_apis_to_create_scan(
-        file_req_header, project, project_file_name, tmpdir, args.asoc_headers
-    )
-    process_project_message = f"FINISHED PROCESSING PROJECT: {project} - {project_file_name}"
-    main_logger.info("#" * (len(process_project_message) + PADDING))
-    main_logger.info(
-        " " * int((PADDING / 2)) + process_project_message + " " * int((PADDING / 2)),
-    )
-    main_logger.info("#" * (len(process_project_message) + PADDING))
+        # generate config file for appscan
+        prepare_and_create_static_scan(
+            args,
+            project,
+            project_file_name,
+            tmpdir,
+            functools.partial(generate_appscan_config_file, args, project, project_file_name),
+            file_req_header,
+            journal,
+        )
+        process_project_message = f"FINISHED PROCESSING PROJECT: {project} - {project_file_name}"
+        main_logger.info("#" * (len(process_project_message) + PADDING))
+        main_logger.info(
+            " " * int((PADDING / 2)) + process_project_message + " " * int((PADDING / 2)),
+        )
+        main_logger.info("#" * (len(process_project_message) + PADDING))
 
 
 @timer
 @f_logger
+@profile_stage
 def static_scan(args):
     """
-    Prepare and run the static scan.
+    Prepare and run the static scan. Every completed stage is recorded in the
+    run journal, with --resume an interrupted run continues from it.
 
     Args:
         args ([dict]): the arguments passed to the script
     """
+    # the commands of the version log under its own directory
+    set_log_version(args.version_tag)
+    journal = RunJournal(f"{STATIC}_scan_{args.version}")
+    resumed = journal.start(getattr(args, "resume", False), source=args.source)
+    args.work_dir = journal.work_dir
 
     # prepare the header for requests
     file_req_header = {"Authorization": f"Bearer {get_bearer_token()}"}
 
-    # remove the old scans
-    old_scan_status_dict = remove_old_scans(SINGLE_STATIC, args.asoc_headers)
+    # remove the old scans, the ones of the interrupted run are kept when resuming
+    if resumed and journal.get(JOURNAL_OLD_SCANS_REMOVED):
+        old_scan_status_dict = {
+            scan["Name"]: scan["LatestExecution"]["Status"]
+            for scan in get_scans(args.static_app_id, args.asoc_headers)
+        }
+    else:
+        old_scan_status_dict = remove_old_scans(args.static_app_id, args.asoc_headers)
 
     # build source code
-    main_logger.info("Building source code...")
-    build_source_code(args)
+    if journal.get(JOURNAL_SOURCE_BUILT):
+        main_logger.info("Source code was already built, skipping")
+    else:
+        main_logger.info("Building source code...")
+        build_source_code(args)
+        journal.record(JOURNAL_SOURCE_BUILT)
 
     # read the list of projects to scan
     main_logger.info("Getting the projects...")
-    projects = get_projects()
+    projects = [project.strip() for project in get_projects(args.projects_file)]
+
+    # if any of the old scan still pending, return
+    for project in projects:
+        if (
+            project in old_scan_status_dict
+            and old_scan_status_dict[project] in PENDING_STATUSES
+            and not journal.get(JOURNAL_SCAN, project)
+        ):
+            main_logger.info(f"{project} is PENDING/RUNNING")
+            return
+    journal.record(JOURNAL_OLD_SCANS_REMOVED)
 
     # the below block of code would do:
-    # - create tempdir to store the config files
+    # - use the work dir of the journal to store the config and irx files
     # - go through the list of projects
     # - generate the irx file for each project
     # - upload the generated irx file to ASoC
     # - create and execute the static scan
-    with tempfile.TemporaryDirectory(dir=os.getcwd()) as tmpdir:
-        # if any of the old scan still pending, return
+    tmpdir = journal.work_dir
+
+    main_logger.info("Create Static Scan for SBA")
+    create_static_scan_sba(args, tmpdir, file_req_header, journal)
+
+    main_logger.info("Create Static Scan for IAC")
+    create_static_scan_iac(args, tmpdir, file_req_header, journal)
+
+    main_logger.info("Create Static Scan for Operators")
+    create_static_scan_operators(args, file_req_header, journal)
+
+    projects = [project for project in projects if not journal.get(JOURNAL_SCAN, project)]
+    main_logger.debug(f"PROJECTS TO SCAN: {projects}")
+    processes = []
+    # the workers hand their records to a single listener in this process
+    log_dir = None
+    if getattr(args, "project_logs", False):
+        log_dir = get_reports_dir(PROJECT_LOGS, args.date_str, args.version_tag)
+    with queue_logging(log_dir) as log_queue:
+        pool = Pool(processes=3, initializer=init_worker_logging, initargs=(log_queue, args.version_tag))
         for project in projects:
-            project = project.strip()
-            if (
-                project in old_scan_status_dict
-                and old_scan_status_dict[project] in PENDING_STATUSES
-            ):
-                main_logger.info(f"{project} is PENDING/RUNNING")
-                return
-
-        main_logger.info("Create Static Scan for SBA")
-        create_static_scan_sba(args, tmpdir, file_req_header)
-
-        main_logger.info("Create Static Scan for IAC")
-        create_static_scan_iac(args, tmpdir, file_req_header)
-
-        main_logger.info("Create Static Scan for Operators")
-        create_static_scan_operators(args, file_req_header)
-
-        main_logger.debug(f"PROJECTS TO SCAN: {projects}")
-        processes = []
-        pool = Pool(processes=3)
-        for project in projects:
-            static_scan_args = (args, project, tmpdir, file_req_header)
-            results = pool.apply_async(create_static_scan, static_scan_args)
+            static_scan_args = (args, project, tmpdir, file_req_header, current_span_id(), journal)
+            # the timings of the worker come back with the result
+            results = pool.apply_async(run_timed_task, (create_static_scan, *static_scan_args))
             processes.append(results)
             time.sleep(5)
-        for process in processes:
-            process.get()
+        try:
+            for process in processes:
+                merge_task_timings(process.get())
+        finally:
+            # the workers flush their queued records on exit
+            pool.close()
+            pool.join()
+
+    missing = [
+        project
+        for project in projects + ["sba", "iac"] + STATIC_OPERATORS
+        if not journal.get(JOURNAL_SCAN, project)
+    ]
+    if missing:
+        main_logger.warning(f"No scan created for {missing}, rerun with --resume to retry them")
+    else:
+        journal.complete()
 
 
 # ********************************* #
 # *       DYNAMIC SCAN PREP       * #
 # ********************************* #
+def create_dynamic_scan(args, app, url):
+    """
+    Create the dynamic scan for the app.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+        app ([str]): the app name
+        url ([str]): the starting url of the app
+    """
+    user = "admin" if app != "WSC" else "csmith"
+    passwd = "password" if app != "WSC" else "csmith"
+
+    # scan data
+    create_scan_data = {
+        "ScanType": "Staging",
+        "PresenceId": os.environ.get("PRESENCE_ID"),
+        "IncludeVerifiedDomains": False,
+        "StartingUrl": url,
+        "LoginUser": user,
+        "LoginPassword": passwd,
+        "ExtraField": "",
+        "HttpAuthUserName": user,
+        "HttpAuthPassword": passwd,
+        "OnlyFullResults": True,
+        "TestOptimizationLevel": "NoOptimization",
+        "ThreadNum": 5,
+        "ScanName": f"{app} Scan",
+        "EnableMailNotification": False,
+        "Locale": "en",
+        "AppId": args.dynamic_app_id,
+        "Execute": True,
+        "Personal": False,
+        "UseAutomaticTimeout": True,
+        "FullyAutomatic": False,
+    }
+
+    # payload
+    main_logger.info(f"Payload: \n{create_scan_data}\n")
+
+    # creating a new scan
+    main_logger.info(f"Creating a new scan for {app}...")
+    res = requests.post(
+        f"{ASOC_API_ENDPOINT}/Scans/DynamicAnalyzer",
+        json=create_scan_data,
+        headers=args.asoc_headers,
+    )
+    main_logger.debug(res)
+
+
 @timer
 @f_logger
+@profile_stage
 def dynamic_scan(args):
     """
     Prepare and run the dynamic scan.
@@ -440,17 +703,20 @@ def dynamic_scan(args):
     Args:
         args ([dict]): the arguments passed to the script
     """
+    # the commands of the version log under its own directory
+    set_log_version(args.version_tag)
+
+    # get the image tag and start pulling it in the background
+    latest_image = get_version_image(args)
+    image_pull = start_image_pull(latest_image)
 
     # update configs
     configs_dir = f"{os.getcwd()}/app_configs"
     update_config_file(f"{configs_dir}/server.xml")
     update_config_file(f"{configs_dir}/system_overrides.properties")
 
-    # get the image tag
-    latest_image = get_latest_image()
-
     # remove the old scans
-    old_scan_status_dict = remove_old_scans(SINGLE_DYNAMIC, args.asoc_headers)
+    old_scan_status_dict = remove_old_scans(args.dynamic_app_id, args.asoc_headers)
 
     # spin up the containers (rt and db2), if
     # there is no scan in pending statuses
@@ -461,75 +727,133 @@ def dynamic_scan(args):
     # start ASoC presense
     start_asoc_presence()
 
-    # start the app container for the scans
-    start_app_container(latest_image)
+    # the image has to be there before the containers start
+    wait_for_image_pull(image_pull)
 
-    # create the new scans
+    # start the app container for the scans, each app
+    # scan is created as soon as that app is ready
     main_logger.info(f"Create new scan for: {APP_URL_DICT}")
-    for app, url in APP_URL_DICT.items():
-        user = "admin" if app != "WSC" else "csmith"
-        passwd = "password" if app != "WSC" else "csmith"
-
-        # scan data
-        create_scan_data = {
-            "ScanType": "Staging",
-            "PresenceId": os.environ.get("PRESENCE_ID"),
-            "IncludeVerifiedDomains": False,
-            "StartingUrl": url,
-            "LoginUser": user,
-            "LoginPassword": passwd,
-            "ExtraField": "",
-            "HttpAuthUserName": user,
-            "HttpAuthPassword": passwd,
-            "OnlyFullResults": True,
-            "TestOptimizationLevel": "NoOptimization",
-            "ThreadNum": 5,
-            "ScanName": f"{app} Scan",
-            "EnableMailNotification": False,
-            "Locale": "en",
-            "AppId": SINGLE_DYNAMIC,
-            "Execute": True,
-            "Personal": False,
-            "UseAutomaticTimeout": True,
-            "FullyAutomatic": False,
-        }
-
-        # payload
-        main_logger.info(f"Payload: \n{create_scan_data}\n")
-
-        # creating a new scan
-        main_logger.info(f"Creating a new scan for {app}...")
-        res = requests.post(
-            f"{ASOC_API_ENDPOINT}/Scans/DynamicAnalyzer",
-            json=create_scan_data,
-            headers=args.asoc_headers,
-        )
-        main_logger.debug(res)
+    start_app_container(
+        latest_image,
+        rt_name=args.rt_name,
+        on_ready=functools.partial(create_dynamic_scan, args),
+        shards=args.shards,
+        port_offset=args.port_offset,
+    )
 
 
 @timer
 @f_logger
 def run_scan(args):
     """
-    Run the scans. This can run either static or dynamic or both
+    Run the scans. This can run either static or dynamic or both, both run
+    at the same time so the static irx prep overlaps the dynamic deployment.
+    The versions run at the same time too, in the same pipeline.
 
     Args:
         args ([dict]): the arguments passed to the script
     """
-    if args.type == ALL:
-        dynamic_scan(args)
-        static_scan(args)
-    elif args.type == STATIC:
-        static_scan(args)
-    else:
-        dynamic_scan(args)
+    pipeline = Pipeline(SCAN)
+    for version_args in get_versions_args(args):
+        if args.type in (ALL, DYNAMIC):
+            pipeline.add(get_stage_name(version_args, "dynamic_scan"), dynamic_scan, version_args)
+        if args.type in (ALL, STATIC):
+            pipeline.add(get_stage_name(version_args, "static_scan"), static_scan, version_args)
+    run_pipeline(args, pipeline)
+
+
+def get_stage_name(args, name):
+    """
+    Get the pipeline stage name, prefixed by the version when several
+    versions run together.
+
+    Args:
+        args ([dict]): the arguments of the version
+        name ([str]): the stage name
+
+    Returns:
+        [str]: the stage name
+    """
+    return f"{args.version_tag}:{name}" if args.version_tag else name
+
+
+def run_pipeline(args, pipeline):
+    """
+    Run the pipeline and write its report next to the reports. With --profile
+    the stages run one at a time, so each profile only holds its own stage.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+        pipeline ([Pipeline]): the pipeline to run
+
+    Returns:
+        [dict]: what each stage returned
+    """
+    try:
+        return pipeline.run(1 if args.profile else args.jobs)
+    finally:
+        pipeline.write_report(f"reports/{args.date_str}/pipeline_{pipeline.name}.json")
 
 
 # ********************************* #
 # *            REPORTS            * #
 # ********************************* #
+def generate_scan_reports(args, scan):
+    """
+    Generate the reports of a dynamic scan.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+        scan ([dict]): the scan
+
+    Returns:
+        [list]: the generated reports
+    """
+    generated_reports = []
+    for report_file_type in REPORT_FILE_TYPES:
+        config_data = get_download_config(scan["Name"], report_file_type)
+        res = requests.post(
+            f"{ASOC_API_ENDPOINT}/Reports/Security/Scan/{scan['Id']}",
+            json=config_data,
+            headers=args.asoc_headers,
+        )
+        if res.status_code == 200:
+            generated_reports.append(res.json())
+    return generated_reports
+
+
+def generate_app_reports(args, app_name):
+    """
+    Generate and download the reports of the static application.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+        app_name ([str]): the application name
+    """
+    for report_file_type in REPORT_FILE_TYPES:
+        # config data for the reports
+        config_data = get_download_config(app_name, report_file_type)
+
+        # generate the reports for the application
+        res = requests.post(
+            f"{ASOC_API_ENDPOINT}/Reports/Security/Application/{args.static_app_id}",
+            json=config_data,
+            headers=args.asoc_headers,
+        )
+
+        if res.status_code == 200:
+            report = res.json()
+
+            # wait for the report to be ready
+            report_data = wait_for_report(report, args.asoc_headers)
+
+            # download the report
+            download_report(STATIC, report_data, args.version_tag)
+
+
 @timer
 @f_logger
+@profile_stage
 def dynamic_reports(args):
     """
     Generate and download dynamic reports.
@@ -537,41 +861,36 @@ def dynamic_reports(args):
     Args:
         args ([dict]): the arguments passed to the script
     """
-    scans = get_scans(SINGLE_DYNAMIC, args.asoc_headers)
+    scans = get_scans(args.dynamic_app_id, args.asoc_headers)
     generated_reports = []
     all_done = True
     for scan in scans:
         # only generate report for ready scan
         if scan["LatestExecution"]["Status"] == "Ready":
-            for report_file_type in REPORT_FILE_TYPES:
-                config_data = get_download_config(scan["Name"], report_file_type)
-                res = requests.post(
-                    f"{ASOC_API_ENDPOINT}/Reports/Security/Scan/{scan['Id']}",
-                    json=config_data,
-                    headers=args.asoc_headers,
-                )
-                if res.status_code == 200:
-                    generated_reports.append(res.json())
+            generated_reports += generate_scan_reports(args, scan)
         else:
             all_done = False
 
     # clean up when all of the scans complete
     if all_done:
-        cleanup_runtime_container(RT_SCAN)
+        cleanup_runtime_container(args.rt_name)
 
     for report in generated_reports:
         # wait for the report to be ready
         report_data = wait_for_report(report, args.asoc_headers)
 
         # download the report
-        download_report(DYNAMIC, report_data)
+        download_report(DYNAMIC, report_data, args.version_tag)
 
     # upload reports to artifactory
-    upload_reports_to_artifactory(DYNAMIC, f"reports/{args.date_str}/{DYNAMIC}", args.timestamp)
+    upload_reports_to_artifactory(
+        DYNAMIC, get_reports_dir(DYNAMIC, args.date_str, args.version_tag), args.timestamp
+    )
 
 
 @timer
 @f_logger
+@profile_stage
 def static_reports(args):
     """
     Generate and download static reports.
@@ -579,7 +898,7 @@ def static_reports(args):
     Args:
         args ([dict]): the arguments passed to the script
     """
-    scans = get_scans(SINGLE_STATIC, args.asoc_headers)
+    scans = get_scans(args.static_app_id, args.asoc_headers)
     app_name = "static_report"
     # for static reports, we will wait until all of the
     # scan in the static application to finish running
@@ -589,32 +908,17 @@ def static_reports(args):
         if scan["LatestExecution"]["Status"] != "Ready":
             return
 
-    for report_file_type in REPORT_FILE_TYPES:
-        # config data for the reports
-        config_data = get_download_config(app_name, report_file_type)
-
-        # generate the reports for the application
-        res = requests.post(
-            f"{ASOC_API_ENDPOINT}/Reports/Security/Application/{SINGLE_STATIC}",
-            json=config_data,
-            headers=args.asoc_headers,
-        )
-
-        if res.status_code == 200:
-            report = res.json()
-
-            # wait for the report to be ready
-            report_data = wait_for_report(report, args.asoc_headers)
-
-            # download the report
-            download_report(STATIC, report_data)
+    generate_app_reports(args, app_name)
 
     # upload reports to artifactory
-    upload_reports_to_artifactory(STATIC, f"reports/{args.date_str}/{STATIC}", args.timestamp)
+    upload_reports_to_artifactory(
+        STATIC, get_reports_dir(STATIC, args.date_str, args.version_tag), args.timestamp
+    )
 
 
 @timer
 @f_logger
+@profile_stage
 def asoc_export(args, app_type, full_report=False):
     """
     Generate/export scan results.
@@ -622,6 +926,8 @@ def asoc_export(args, app_type, full_report=False):
     Args:
         app_type ([str]): type of scan
     """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
     # filters
     if full_report is not True:
         filters = "$filter=Status%20ne%20'Fixed'%20and%20Status%20ne%20'Noise'&$orderby=ScanName"
@@ -632,7 +938,7 @@ def asoc_export(args, app_type, full_report=False):
 
     # request the reports
     main_logger.info("Getting the reports...")
-    app_id = SINGLE_STATIC if app_type == STATIC else SINGLE_DYNAMIC
+    app_id = args.static_app_id if app_type == STATIC else args.dynamic_app_id
     if full_report is True:
         res = requests.get(
             f"{ASOC_API_ENDPOINT}/Issues/Application/{app_id}",
@@ -645,7 +951,7 @@ def asoc_export(args, app_type, full_report=False):
         )
     main_logger.info(res)
     if res.status_code == 200:
-        reports_dir_path = f"reports/{args.date_str}/{app_type}"
+        reports_dir_path = get_reports_dir(app_type, args.date_str, args.version_tag)
         create_dir(reports_dir_path)
 
         report_file_name = "issues" if full_report is True else "issues_filtered"
@@ -690,7 +996,7 @@ def asoc_export(args, app_type, full_report=False):
         main_logger.info("Export to excel...")
         read_file.to_excel(f"{reports_dir_path}/{report_file_name}.xlsx", index=None, header=True)
 
-        copy_tree(f"reports/{args.date_str}/{app_type}", f"reports/latest/{app_type}")
+        copy_tree(reports_dir_path, get_reports_dir(app_type, "latest", args.version_tag))
 
 
 @timer
@@ -701,109 +1007,390 @@ def get_reports(args):
     Args:
         args ([dict]): the arguments passed to the script
     """
-    if args.type == ALL:
-        static_reports(args)
-        dynamic_reports(args)
-        asoc_export(args, DYNAMIC)
-        asoc_export(args, STATIC)
-        asoc_export(args, STATIC, full_report=True)
-    elif args.type == STATIC:
-        static_reports(args)
-        asoc_export(args, STATIC)
-        asoc_export(args, STATIC, full_report=True)
-    elif args.type == DYNAMIC:
-        dynamic_reports(args)
-        asoc_export(args, DYNAMIC)
+    # the exports copy the whole report dir to latest, so they wait for the
+    # downloaded reports and for each other
+    pipeline = Pipeline(REPORTS)
+    for version_args in get_versions_args(args):
+        if args.type in (ALL, STATIC):
+            static_stage = get_stage_name(version_args, "static_reports")
+            export_stage = get_stage_name(version_args, "asoc_export_static")
+            pipeline.add(static_stage, static_reports, version_args)
+            pipeline.add(export_stage, asoc_export, version_args, STATIC, deps=[static_stage])
+            pipeline.add(
+                get_stage_name(version_args, "asoc_export_static_full"),
+                asoc_export,
+                version_args,
+                STATIC,
+                full_report=True,
+                deps=[export_stage],
+            )
+        if args.type in (ALL, DYNAMIC):
+            dynamic_stage = get_stage_name(version_args, "dynamic_reports")
+            pipeline.add(dynamic_stage, dynamic_reports, version_args)
+            pipeline.add(
+                get_stage_name(version_args, "asoc_export_dynamic"),
+                asoc_export,
+                version_args,
+                DYNAMIC,
+                deps=[dynamic_stage],
+            )
+    run_pipeline(args, pipeline)
 
 
 # ********************************* #
-# *           DEPCHECK            * #
+# *             WATCH             * #
 # ********************************* #
+def harvest_dynamic_scan(args, scan):
+    """
+    Download the reports of a ready dynamic scan.
+
+    Args:
+        args ([dict]): the arguments of the version
+        scan ([dict]): the ready scan
+    """
+    for report in generate_scan_reports(args, scan):
+        download_report(DYNAMIC, wait_for_report(report, args.asoc_headers), args.version_tag)
+
+
+def harvest_static_app(args, app_name):
+    """
+    Download the reports of the static application once all of its scans are
+    ready.
+
+    Args:
+        args ([dict]): the arguments of the version
+        app_name ([str]): the application name
+    """
+    generate_app_reports(args, app_name)
+
+
+def export_harvests(args, app_type, export_lock):
+    """
+    Export and upload the results of an application once for all of the
+    reports harvested in a poll cycle.
+
+    Args:
+        args ([dict]): the arguments of the version
+        app_type ([str]): the scan type
+        export_lock ([threading.Lock]): serializes the exports of the application
+    """
+    with export_lock:
+        asoc_export(args, app_type)
+        if app_type == STATIC:
+            asoc_export(args, STATIC, full_report=True)
+        upload_reports_to_artifactory(
+            app_type, get_reports_dir(app_type, args.date_str, args.version_tag), args.timestamp
+        )
+
+
 @timer
 @f_logger
-def download_depcheck_tool(download_dir):
+def watch(args):
+    """
+    Watch the scans and harvest them as soon as they finish: each dynamic
+    scan when it is ready, the static application when all of its scans are.
+    The states of the first poll are the baseline, only the scans that get
+    ready after it are harvested. The harvests of a poll cycle are exported
+    and uploaded once per application, and the runtime container is cleaned
+    up once the pending dynamic scans are done. ASoC is polled more often
+    while the states change, less often while they do not. Returns once the
+    pending scans of every application are done and everything is harvested,
+    right after the baseline when no scan is pending, or after --hours.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+
+    Raises:
+        Exception: exception raised when a harvest failed
+    """
+    targets = []
+    for version_args in get_versions_args(args):
+        if args.type in (ALL, STATIC):
+            targets.append((version_args, STATIC, version_args.static_app_id))
+        if args.type in (ALL, DYNAMIC):
+            targets.append((version_args, DYNAMIC, version_args.dynamic_app_id))
+    # the versions can share an application, so the state is kept per version and type
+    states = {}
+    export_locks = {
+        (version_args.version, app_type): threading.Lock() for version_args, app_type, _ in targets
+    }
+    saw_pending = {key: False for key in export_locks}
+    finished = {key: False for key in export_locks}
+    # harvest key to its future, None for the ones ready at the baseline
+    harvests = {}
+    # the harvests of a poll cycle waiting to be exported together
+    cycles = []
+    tasks = []
+    interval = WATCH_MIN_INTERVAL
+    token_time = time.time()
+    deadline = time.time() + args.hours * 3600
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        while True:
+            if time.time() - token_time > WATCH_TOKEN_REFRESH:
+                # the versions share the headers, refresh them in place
+                args.asoc_headers.update(get_asoc_req_headers())
+                token_time = time.time()
+            # the reports of a run going past midnight go to the new day
+            date_str = get_date_str()
+
+            changed = False
+            for version_args, app_type, app_id in targets:
+                version_args.date_str = date_str
+                try:
+                    scans = get_scans(app_id, args.asoc_headers)
+                except Exception as error:
+                    main_logger.warning(
+                        f"Could not get the {app_type} scans of {version_args.version}, retrying later: {error}"
+                    )
+                    continue
+                target = (version_args.version, app_type)
+                baseline = target not in states
+                app_states = states.setdefault(target, {})
+
+                ready = []
+                for scan in scans:
+                    status = scan["LatestExecution"]["Status"]
+                    if app_states.get(scan["Id"]) != status:
+                        main_logger.info(
+                            f"{app_type} scan {scan['Name']}: {app_states.get(scan['Id'])} -> {status}"
+                        )
+                        app_states[scan["Id"]] = status
+                        changed = True
+                    if app_type == DYNAMIC and status == "Ready":
+                        ready.append(((version_args.version, DYNAMIC, scan["LatestExecution"]["Id"]), scan))
+
+                statuses = [scan["LatestExecution"]["Status"] for scan in scans]
+                if app_type == STATIC and scans and all(status == "Ready" for status in statuses):
+                    execution_ids = tuple(sorted(scan["LatestExecution"]["Id"] for scan in scans))
+                    ready.append(((version_args.version, STATIC, execution_ids), scans[0]["AppName"]))
+
+                cycle = []
+                for key, item in ready:
+                    if key in harvests:
+                        continue
+                    if baseline:
+                        harvests[key] = None
+                        continue
+                    harvest = harvest_dynamic_scan if app_type == DYNAMIC else harvest_static_app
+                    harvests[key] = executor.submit(bind_span(harvest), version_args, item)
+                    cycle.append(harvests[key])
+                if cycle:
+                    cycles.append((version_args, app_type, target, cycle))
+
+                pending = bool(set(statuses) & set(PENDING_STATUSES))
+                if pending:
+                    saw_pending[target] = True
+                    finished[target] = False
+                elif saw_pending[target]:
+                    saw_pending[target] = False
+                    finished[target] = True
+                    if app_type == DYNAMIC:
+                        tasks.append(executor.submit(cleanup_runtime_container, version_args.rt_name))
+                elif baseline:
+                    # nothing to wait for unless a scan gets pending later
+                    finished[target] = True
+
+            # export once the harvests of a cycle are done, the failed ones are reported at the end
+            for cycle in [cycle for cycle in cycles if all(future.done() for future in cycle[3])]:
+                cycles.remove(cycle)
+                version_args, app_type, target, futures = cycle
+                if any(future.exception() is None for future in futures):
+                    tasks.append(
+                        executor.submit(
+                            bind_span(export_harvests), version_args, app_type, export_locks[target]
+                        )
+                    )
+
+            futures = [future for future in harvests.values() if future] + tasks
+            running = [future for future in futures if not future.done()]
+            if all(finished.values()) and not running and not cycles:
+                main_logger.info("The pending scans are done and everything is harvested")
+                break
+            if time.time() > deadline:
+                main_logger.warning(f"Stopped watching after {args.hours}h")
+                break
+
+            interval = (
+                WATCH_MIN_INTERVAL if changed else min(interval * WATCH_BACKOFF, WATCH_MAX_INTERVAL)
+            )
+            main_logger.info(f"Next poll in {interval:.0f}s, {len(running)} task(s) running")
+            if running:
+                # wake up early when a harvest completes
+                wait(running, timeout=interval, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(interval)
+
+    futures = {key: future for key, future in harvests.items() if future}
+    futures.update({f"task {index}": future for index, future in enumerate(tasks)})
+    failed = [key for key, future in futures.items() if future.exception() is not None]
+    for key in failed:
+        main_logger.warning(f"{key} failed: {futures[key].exception()}")
+    if failed:
+        raise Exception(f"{len(failed)} harvest(s) or export(s) failed")
+
+
+# ********************************* #
+# *           DEPCHECK            * #
+# ********************************* #
+def get_depcheck_image():
+    """
+    Get the latest image for the depcheck.
+
+    Returns:
+        [str]: the latest image
+    """
+    latest_image = get_latest_image()
+    assert latest_image is not None
+    return latest_image
+
+
+def start_depcheck_runtime(image):
     """
-    Download depcheck tool.
+    Start the depcheck runtime container, an error is only logged since the
+    container may already be up.
 
     Args:
-        download_dir ([str]): the directory to download the depcheck tool to
+        image ([str]): the image of the container
     """
-    main_logger.info("Downloading updated dependency check tool...")
-    res = requests.get(DEPCHECK_REPO)
-    tag_name = res.json()["tag_name"].replace("v", "")
-    download_url = f"https://github.com/jeremylong/DependencyCheck/releases/download/v{tag_name}/dependency-check-{tag_name}-release.zip"
-    res = requests.get(download_url, allow_redirects=True)
-    zip_file = zipfile.ZipFile(io.BytesIO(res.content))
-    zip_file.extractall(f"{download_dir}")
-    run_subprocess(f"chmod +x {download_dir}/dependency-check/bin/dependency-check.sh")
+    try:
+        start_depcheck_container(image, rt_name=DEPCHECK_SCAN)
+    except Exception as error:
+        main_logger.warning(error)
 
 
 @timer
 @f_logger
+@profile_stage
 def depcheck(args):
     """
-    Run and export report for the dependency check.
+    Run and export report for the dependency check. The image pull, the
+    container start and the jar extraction run alongside the tool download
+    and the data update.
 
     Args:
         args ([dict]): the arguments passed to the script
     """
     try:
-        # get the latest image
-        latest_image = get_latest_image()
-        assert latest_image is not None
-
-        # start runtime container
-        try:
-            start_depcheck_container(latest_image, rt_name=DEPCHECK_SCAN)
-        except Exception as error:
-            main_logger.warning(error)
-
         # creating the source dir
         with tempfile.TemporaryDirectory(dir=os.getcwd()) as tmpdir:
-            third_party_jars = "3rdpartyjars"
+            jar_dir = f"{tmpdir}/3rdpartyjars"
+            reports_dir_path = f"reports/{args.date_str}/{args.mode}"
+            create_dir(reports_dir_path)
 
-            # build the ear
-            main_logger.info("Getting jars to scans...")
-            run_subprocess(
-                f'docker exec {DEPCHECK_SCAN} bash -lc \'cd /opt/ibm/wlp/usr/servers/defaultServer/dropins/smcfs.ear/ && mkdir -p mkdir ../{third_party_jars} && rm -rf ../{third_party_jars}/* && for file in $(find ./*/ -type f -name "*.jar" -not -path "*ui.jar" -not -path "*platform_*" -not -path "*xapi.jar" -not -path "*yfscommon*icons*" -not -path "*yfscommon*y*"); do cp -vf $file /opt/ibm/wlp/usr/servers/defaultServer/dropins/{third_party_jars}/; done\''
+            pipeline = Pipeline(DEPCHECK)
+            # the runtime container and its jars
+            pipeline.add("image", get_depcheck_image)
+            pipeline.add(
+                "image_pull",
+                lambda: wait_for_image_pull(start_image_pull(pipeline.result("image"))),
+                deps=["image"],
             )
-
-            # copy the 3rd party jars to temp dir
-            main_logger.info("Copying 3rd party jars to tempdir...")
-            run_subprocess(
-                f"docker cp {DEPCHECK_SCAN}:/opt/ibm/wlp/usr/servers/defaultServer/dropins/{third_party_jars}/ {tmpdir}/"
+            pipeline.add(
+                "container",
+                lambda: start_depcheck_runtime(pipeline.result("image")),
+                deps=["image_pull"],
+            )
+            pipeline.add(
+                "extract_jars",
+                extract_jars_from_container,
+                DEPCHECK_SCAN,
+                SMCFS_EAR_PATH,
+                jar_dir,
+                DEPCHECK_JAR_EXCLUDES,
+                deps=["container"],
+            )
+            # the tool and its data
+            pipeline.add("depcheck_tool", download_depcheck_tool)
+            pipeline.add(
+                "depcheck_data",
+                lambda: update_depcheck_data(pipeline.result("depcheck_tool")),
+                deps=["depcheck_tool"],
             )
-
-            # download the latest depcheck
-            main_logger.info("Download the latest depcheck...")
-            download_depcheck_tool(tmpdir)
-
             # run dependency check
-            main_logger.info("Running the scan...")
-            reports_dir_path = f"reports/{args.date_str}/{args.mode}"
-            create_dir(reports_dir_path)
-            run_subprocess(
-                f"{tmpdir}/dependency-check/bin/dependency-check.sh -s {tmpdir}/{third_party_jars} -o {reports_dir_path}/dependency_report.html --suppression {os.getcwd()}/suppressions.xml"
+            pipeline.add(
+                "depcheck_scan",
+                lambda: run_incremental_depcheck(
+                    pipeline.result("depcheck_tool"),
+                    jar_dir,
+                    reports_dir_path,
+                    f"{os.getcwd()}/suppressions.xml",
+                    shards=args.shards,
+                ),
+                deps=["extract_jars", "depcheck_data"],
+            )
+            # structured results and the delta against the latest ones
+            pipeline.add(
+                "depcheck_export",
+                lambda: export_depcheck_results(
+                    pipeline.result("depcheck_scan"), reports_dir_path, f"reports/latest/{args.mode}"
+                ),
+                deps=["depcheck_scan"],
+            )
+            pipeline.add(
+                "copy_latest",
+                copy_tree,
+                f"reports/{args.date_str}/{args.mode}",
+                f"reports/latest/{args.mode}",
+                deps=["depcheck_export"],
             )
-            copy_tree(f"reports/{args.date_str}/{args.mode}", f"reports/latest/{args.mode}")
-
             # upload reports to artifactory
-            upload_reports_to_artifactory(
-                DEPCHECK, f"reports/{args.date_str}/{DEPCHECK}", args.timestamp
+            pipeline.add(
+                "upload",
+                upload_reports_to_artifactory,
+                DEPCHECK,
+                f"reports/{args.date_str}/{DEPCHECK}",
+                args.timestamp,
+                deps=["depcheck_export"],
             )
-
-            # clean up depcheck container
-            cleanup_runtime_container(DEPCHECK_SCAN)
+            # clean up depcheck container, only needed for the jars
+            pipeline.add("cleanup", cleanup_runtime_container, DEPCHECK_SCAN, deps=["extract_jars"])
+            run_pipeline(args, pipeline)
 
     except Exception as error:
         main_logger.warning(traceback.format_exc())
         main_logger.warning(error)
-        run_subprocess(f"docker rm -f {DEPCHECK_SCAN} 2> /dev/null")
-        run_subprocess("docker volume prune -f 2> /dev/null")
         raise
     finally:
-        run_subprocess(f"docker rm -f {DEPCHECK_SCAN} 2> /dev/null")
-        run_subprocess("docker volume prune -f 2> /dev/null")
+        remove_container(DEPCHECK_SCAN)
+        enforce_image_retention()
+
+
+# ********************************* #
+# *         SUPPRESSIONS          * #
+# ********************************* #
+@timer
+@f_logger
+def check_suppressions(args):
+    """
+    Validate the suppressions against the latest depcheck results and
+    re-apply them locally, without a new Dependency-Check run.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+    """
+    suppressions = load_suppressions(args.input)
+    if args.merged:
+        suppressions = merge_suppressions(suppressions)
+        write_suppressions(suppressions, args.merged)
+
+    reports_dir_path = f"reports/latest/{DEPCHECK}"
+    with open(f"{reports_dir_path}/{DEPCHECK_REPORT}.json", "r") as file:
+        report = json.load(file)
+    usage = apply_suppressions(report, suppressions)
+    with open(f"{reports_dir_path}/{DEPCHECK_REPORT}.json", "w") as file:
+        json.dump(report, file)
+    shard_reports = sorted(
+        name for name in os.listdir(reports_dir_path) if name.startswith(f"{DEPCHECK_REPORT}_shard_")
+    )
+    write_depcheck_html(report, f"{reports_dir_path}/{DEPCHECK_REPORT}.html", shard_reports)
+    export_depcheck_results(report, reports_dir_path)
+
+    issues = get_suppression_issues(suppressions, usage)
+    for issue in issues["dead"]:
+        main_logger.warning(f"DEAD: {issue}")
+    for issue in issues["unused"]:
+        main_logger.warning(f"UNUSED: {issue}")
 
 
 # ********************************* #
@@ -819,18 +1406,24 @@ def main():
     args = parse_arguments()
     args.date_str = get_date_str()
     args.timestamp = datetime.today().strftime("%y%m%d_%H%m")
-    args.asoc_headers = get_asoc_req_headers()
+    if args.mode != SUPPRESSIONS:
+        args.asoc_headers = get_asoc_req_headers()
     main_logger.info(args)
-    if args.mode == SCAN:
-        run_scan(args)
-    elif args.mode == REPORTS:
-        get_reports(args)
-    elif args.mode == DEPCHECK:
-        depcheck(args)
-    # except Exception as error:
-    #     main_logger.info(error)
-    #     cleanup()
-    #     raise
+    start_tracing()
+    try:
+        if args.mode == SCAN:
+            run_scan(args)
+        elif args.mode == REPORTS:
+            get_reports(args)
+        elif args.mode == DEPCHECK:
+            depcheck(args)
+        elif args.mode == SUPPRESSIONS:
+            check_suppressions(args)
+        elif args.mode == WATCH:
+            watch(args)
+    finally:
+        timing_collector.dump(f"reports/{args.date_str}/timings_{args.mode}.json")
+        export_trace(f"reports/{args.date_str}/trace_{args.mode}.json")
 
 
 if __name__ == "__main__":
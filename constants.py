@@ -8,12 +8,41 @@ SINGLE_STREAM_RSS_URL = (
     "https://wce-sterling-team-oms-jenkins.swg-devops.com/job/COC_OMS_Dev.Build/rssAll"
 )
 DEPCHECK_REPO = "https://api.github.com/repos/jeremylong/DependencyCheck/releases/latest"
-DEPLOY_SERVER = "https://9.42.105.123:9443"
-SMCFS_URL = f"{DEPLOY_SERVER}/smcfs/console/login.jsp"
-SBC_URL = f"{DEPLOY_SERVER}/sbc/sbc/login.do"
-SMA_URL = f"{DEPLOY_SERVER}/sma/sma/container/home.do"
-ISCCS_URL = f"{DEPLOY_SERVER}/isccs/isccs/login.do"
-WSC_URL = f"{DEPLOY_SERVER}/wsc/wsc/login.do"
+DEPCHECK_TOOL_VERSIONS_KEPT = 2
+DEPCHECK_DATA_MAX_AGE_HOURS = 24
+DEPCHECK_REPORT = "dependency_report"
+SUPPRESSION_FILE = "suppressions.xml"
+SUPPRESSION_NS = "https://jeremylong.github.io/DependencyCheck/dependency-suppression.1.3.xsd"
+DEPCHECK_FINDINGS = "dependency_findings"
+DEPCHECK_DELTA = "cve_delta"
+DEPCHECK_INDEX_FIELDS = ["Cve", "Package", "Severity"]
+DEPCHECK_HEADER_FIELDS = [
+    "Package",
+    "FileName",
+    "Sha1",
+    "Cve",
+    "Severity",
+    "Cvss",
+    "Source",
+    "Description",
+]
+DEPLOY_HOST = "https://9.42.105.123"
+RT_HTTP_PORT = 9080
+RT_HTTPS_PORT = 9443
+RT_PORT_STEP = 100
+DEPLOY_SERVER = f"{DEPLOY_HOST}:{RT_HTTPS_PORT}"
+APP_PATH_DICT = {
+    "SMCFS": "/smcfs/console/login.jsp",
+    "SBC": "/sbc/sbc/login.do",
+    "SMA": "/sma/sma/container/home.do",
+    "ISCCS": "/isccs/isccs/login.do",
+    "WSC": "/wsc/wsc/login.do",
+}
+SMCFS_URL = f"{DEPLOY_SERVER}{APP_PATH_DICT['SMCFS']}"
+SBC_URL = f"{DEPLOY_SERVER}{APP_PATH_DICT['SBC']}"
+SMA_URL = f"{DEPLOY_SERVER}{APP_PATH_DICT['SMA']}"
+ISCCS_URL = f"{DEPLOY_SERVER}{APP_PATH_DICT['ISCCS']}"
+WSC_URL = f"{DEPLOY_SERVER}{APP_PATH_DICT['WSC']}"
 APP_URL_DICT = {
     "SMCFS": SMCFS_URL,
     "SBC": SBC_URL,
@@ -25,9 +54,11 @@ NS = {"W3": "http://www.w3.org/2005/Atom"}
 DYNAMIC = "dynamic"
 STATIC = "static"
 DEPCHECK = "depcheck"
+SUPPRESSIONS = "suppressions"
 ALL = "all"
 SCAN = "scan"
 REPORTS = "reports"
+WATCH = "watch"
 PENDING_STATUSES = ["Running", "InQueue", "Paused", "Pausing", "Stopping"]
 TIME_TO_SLEEP = 120
 SINGLE = "single"
@@ -35,6 +66,9 @@ COCDEV = "cocdev"
 COC = "coc"
 V95 = "9.5"
 V10 = "10.0"
+APP_REGISTRY_FILE = "app_registry.json"
+REGISTRY_LATEST_IMAGE = "latest"
+REGISTRY_RELEASED_IMAGE = "released"
 SBA_JAR_URL = "https://wce-sterling-team-oms-jenkins.swg-devops.com/job/SBA/lastSuccessfulBuild/artifact/SBA.jar"
 SBA_JAR = "SBA.jar"
 IAC_JAR_URL = "https://wce-sterling-team-oms-jenkins.swg-devops.com/job/IAC/lastSuccessfulBuild/artifact/IAC.jar"
@@ -47,6 +81,42 @@ CASE_INDEX_URL = (
     "https://raw.githubusercontent.com/IBM/cloud-pak/master/repo/case/ibm-oms-ent-case/index.yaml"
 )
 
+# download consts
+HTTP_POOL_SIZE = 16
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_SEGMENTS = 4
+DOWNLOAD_SEGMENT_THRESHOLD = 64 * 1024 * 1024
+UPLOAD_WORKERS = 4
+
+# subprocess consts
+SUBPROCESS_MAX_LINES = 10000
+SUBPROCESS_KILL_GRACE = 10
+SUBPROCESS_LOGS = "subprocess_logs"
+SUBPROCESS_LOG_INDEX = "index.jsonl"
+
+# logging consts
+PROJECT_LOGS = "project_logs"
+
+# startup consts
+STARTUP_IMPORT_BUDGET = 1.0
+STARTUP_BENCHMARK_RUNS = 5
+STARTUP_LAZY_MODULES = ["pandas", "bs4", "yaml", "coloredlogs", "docker"]
+
+# watch consts
+WATCH_MIN_INTERVAL = 60
+WATCH_MAX_INTERVAL = 900
+WATCH_BACKOFF = 1.5
+WATCH_MAX_HOURS = 24
+WATCH_TOKEN_REFRESH = 30 * 60
+
+# pipeline consts
+PIPELINE_WORKERS = 3
+
+# profile consts
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_ALLOCATIONS = 25
+
 # jazz
 JAZZ_SINGLE_WS_ID = "1016"
 
@@ -56,6 +126,23 @@ RT_SCAN = "rt_scan"
 VOL_SCAN = "vol_scan"
 NETWORK_SCAN = "network_scan"
 DEPCHECK_SCAN = "depcheck_scan"
+SMCFS_EAR_PATH = "/opt/ibm/wlp/usr/servers/defaultServer/dropins/smcfs.ear"
+DEPCHECK_JAR_EXCLUDES = [
+    "*ui.jar",
+    "*platform_*",
+    "*xapi.jar",
+    "*yfscommon*icons*",
+    "*yfscommon*y*",
+]
+IMAGE_RETENTION_MATCH = "om-app"
+IMAGE_RETENTION_COUNT = 3
+IMAGE_DISK_BUDGET = 60 * 1024 ** 3
+IMAGE_INDEX_FILE = "images.json"
+AUTOMATOR_LABEL = "appscan-automator"
+READINESS_DEADLINE = 2 * 3600
+READINESS_PROBE_TIMEOUT = 20
+READINESS_MIN_BACKOFF = 5
+READINESS_MAX_BACKOFF = 60
 
 # ASoC consts
 OMS_APP_ID = "87af65be-ef31-4aa7-871f-8354e19d6328"
@@ -68,6 +155,17 @@ APPSCAN_CONFIG_OP = "appscan-config-op.xml"
 APPSCAN_ZIP_URL = "https://cloud.appscan.com/api/SCX/StaticAnalyzer/SAClientUtil?os=linux"
 REPORT_FILE_TYPES = ["Html", "Pdf"]
 MAX_TRIES = 5
+
+STATIC_OPERATORS = ["ibm-oms-operator", "ibm-jwt-verifier-operator", "ibm-sip-operator", "oms-gateway"]
+
+# run journal stages
+JOURNAL_OLD_SCANS_REMOVED = "old_scans_removed"
+JOURNAL_SOURCE_BUILT = "source_built"
+JOURNAL_OPERATORS_CLONED = "operators_cloned"
+JOURNAL_CONFIG = "config_rendered"
+JOURNAL_IRX = "irx_prepared"
+JOURNAL_UPLOADED = "uploaded"
+JOURNAL_SCAN = "scan_created"
 HEADER_FIELDS = [
     "ScanName",
     "DateCreated",
@@ -0,0 +1,666 @@
+""" Dependency Check Utils """
+import csv
+import fcntl
+import html
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+
+from constants import (DEPCHECK_DATA_MAX_AGE_HOURS, DEPCHECK_DELTA, DEPCHECK_FINDINGS,
+                       DEPCHECK_HEADER_FIELDS, DEPCHECK_INDEX_FIELDS, DEPCHECK_REPO,
+                       DEPCHECK_REPORT, DEPCHECK_TOOL_VERSIONS_KEPT)
+from main_logger import main_logger
+from settings import CACHE_DIR
+from suppression_utils import apply_suppressions, load_suppressions
+from trace_utils import bind_span
+from utils import download, f_logger, get_file_digests, run_subprocess, timer
+
+DEPCHECK_TOOL_CACHE = f"{CACHE_DIR}/dependency-check"
+DEPCHECK_DATA_DIR = f"{CACHE_DIR}/dependency-check-data"
+DEPCHECK_DATA_MARKER = f"{DEPCHECK_DATA_DIR}/last_update.json"
+DEPCHECK_FINDINGS_CACHE = f"{CACHE_DIR}/dependency-check-findings.json"
+
+
+def get_version_key(version):
+    """
+    Get the sort key of a release version.
+
+    Args:
+        version ([str]): the version, e.g. 9.0.9
+
+    Returns:
+        [tuple]: the numeric parts of the version
+    """
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+def get_cached_depcheck_versions():
+    """
+    Get the cached versions of the dependency check tool, newest first.
+
+    Returns:
+        [list]: the cached versions
+    """
+    if not os.path.isdir(DEPCHECK_TOOL_CACHE):
+        return []
+    versions = [
+        version
+        for version in os.listdir(DEPCHECK_TOOL_CACHE)
+        if os.path.isfile(f"{DEPCHECK_TOOL_CACHE}/{version}/dependency-check/bin/dependency-check.sh")
+    ]
+    return sorted(versions, key=get_version_key, reverse=True)
+
+
+@timer
+@f_logger
+def download_depcheck_tool():
+    """
+    Get the dependency check tool from the versioned cache. The release is
+    only downloaded, streamed to disk, when its tag is not cached yet. When
+    the release API is unreachable the newest cached version is used.
+
+    Raises:
+        Exception: the release API is unreachable and nothing is cached
+
+    Returns:
+        [str]: the home directory of the dependency check tool
+    """
+    try:
+        res = requests.get(DEPCHECK_REPO, timeout=30)
+        res.raise_for_status()
+        tag_name = res.json()["tag_name"].replace("v", "")
+    except Exception as error:
+        cached_versions = get_cached_depcheck_versions()
+        if not cached_versions:
+            raise Exception(f"Release API unreachable and no cached dependency check: {error}")  # pylint: disable=raise-missing-from
+        main_logger.warning(f"Release API unreachable ({error}), using cached {cached_versions[0]}")
+        return f"{DEPCHECK_TOOL_CACHE}/{cached_versions[0]}/dependency-check"
+
+    depcheck_home = f"{DEPCHECK_TOOL_CACHE}/{tag_name}/dependency-check"
+    if tag_name in get_cached_depcheck_versions():
+        main_logger.info(f"Using cached dependency check {tag_name}")
+        return depcheck_home
+
+    main_logger.info(f"Downloading dependency check {tag_name}...")
+    os.makedirs(DEPCHECK_TOOL_CACHE, exist_ok=True)
+    download_url = f"https://github.com/jeremylong/DependencyCheck/releases/download/v{tag_name}/dependency-check-{tag_name}-release.zip"
+    with tempfile.TemporaryDirectory(dir=DEPCHECK_TOOL_CACHE) as tmpdir:
+        if not download(download_url, "dependency-check.zip", tmpdir):
+            raise Exception(f"Downloading dependency check {tag_name} failed")
+        with zipfile.ZipFile(f"{tmpdir}/dependency-check.zip") as zip_file:
+            zip_file.extractall(f"{tmpdir}/{tag_name}")
+        for script in os.listdir(f"{tmpdir}/{tag_name}/dependency-check/bin"):
+            script_path = f"{tmpdir}/{tag_name}/dependency-check/bin/{script}"
+            os.chmod(script_path, os.stat(script_path).st_mode | stat.S_IXUSR | stat.S_IXGRP)
+        shutil.rmtree(f"{DEPCHECK_TOOL_CACHE}/{tag_name}", ignore_errors=True)
+        os.replace(f"{tmpdir}/{tag_name}", f"{DEPCHECK_TOOL_CACHE}/{tag_name}")
+
+    # drop the old versions
+    for version in get_cached_depcheck_versions()[DEPCHECK_TOOL_VERSIONS_KEPT:]:
+        main_logger.info(f"Removing cached dependency check {version}")
+        shutil.rmtree(f"{DEPCHECK_TOOL_CACHE}/{version}", ignore_errors=True)
+    return depcheck_home
+
+
+@contextmanager
+def depcheck_data_lock(exclusive=False):
+    """
+    Lock the persistent data directory. Updates take the lock exclusively,
+    scans share it, so concurrent runs never read a half updated database.
+
+    Args:
+        exclusive (bool, optional): take the lock exclusively. Defaults to False.
+    """
+    os.makedirs(DEPCHECK_DATA_DIR, exist_ok=True)
+    with open(f"{DEPCHECK_DATA_DIR}/.automator.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_depcheck_data_freshness():
+    """
+    Get the freshness of the persistent data directory.
+
+    Returns:
+        [dict]: last_update (epoch seconds, None if never updated), age_hours and size_mb
+    """
+    last_update = None
+    if os.path.exists(DEPCHECK_DATA_MARKER):
+        with open(DEPCHECK_DATA_MARKER, "r") as file:
+            last_update = json.load(file)["last_update"]
+    size = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(DEPCHECK_DATA_DIR)
+        for name in names
+    )
+    return {
+        "last_update": last_update,
+        "age_hours": None if last_update is None else (time.time() - last_update) / 3600,
+        "size_mb": size / 1024 ** 2,
+    }
+
+
+@timer
+@f_logger
+def update_depcheck_data(depcheck_home):
+    """
+    Incrementally update the persistent vulnerability database, at most once
+    every DEPCHECK_DATA_MAX_AGE_HOURS. When the update fails, the existing
+    database is used as long as there is one.
+
+    Args:
+        depcheck_home ([str]): the home directory of the dependency check tool
+
+    Raises:
+        Exception: the update failed and there is no database to fall back to
+
+    Returns:
+        [dict]: the freshness of the data directory after the update
+    """
+    before = get_depcheck_data_freshness()
+    main_logger.info(f"Dependency check data before update: {before}")
+    if before["age_hours"] is not None and before["age_hours"] < DEPCHECK_DATA_MAX_AGE_HOURS:
+        main_logger.info("Dependency check data is fresh, skipping the update")
+        return before
+    nvd_api_key = os.environ.get("NVD_API_KEY")
+    with depcheck_data_lock(exclusive=True), tempfile.TemporaryDirectory() as key_dir:
+        # the key goes through a private property file, never on the command line
+        nvd_api_key_opt = ""
+        if nvd_api_key:
+            with open(f"{key_dir}/nvd.properties", "w") as file:
+                file.write(f"nvd.api.key={nvd_api_key}\n")
+            nvd_api_key_opt = f" --propertyfile {key_dir}/nvd.properties"
+        start_time = time.time()
+        try:
+            run_subprocess(
+                f"{depcheck_home}/bin/dependency-check.sh --updateonly --data {DEPCHECK_DATA_DIR}{nvd_api_key_opt}"
+            )
+        except Exception as error:
+            if before["last_update"] is None:
+                raise
+            main_logger.warning(f"Dependency check data update failed, using existing data: {error}")
+            return before
+        with open(DEPCHECK_DATA_MARKER, "w") as file:
+            json.dump({"last_update": time.time(), "duration": time.time() - start_time}, file)
+    after = get_depcheck_data_freshness()
+    main_logger.info(
+        f"Dependency check data updated in {time.time() - start_time:.0f}s, now {after['size_mb']:.0f} MB"
+    )
+    return after
+
+
+def fingerprint_jars(jar_dir):
+    """
+    Fingerprint the jars by sha1.
+
+    Args:
+        jar_dir ([str]): directory of the jars
+
+    Returns:
+        [dict]: sha1 keyed by jar file name
+    """
+    return {
+        name: get_file_digests(f"{jar_dir}/{name}", ("sha1",))["sha1"]
+        for name in sorted(os.listdir(jar_dir))
+        if name.endswith(".jar")
+    }
+
+
+def get_findings_cache_key(depcheck_home, suppression):
+    """
+    Get the key the cached findings are valid for: the vulnerability data
+    version, the tool version and the digest of the suppression file.
+    Dependency-Check applies the CPE suppressions during the analysis, so the
+    cached findings depend on them too.
+
+    Args:
+        depcheck_home ([str]): the home directory of the dependency check tool
+        suppression ([str]): path of the suppression file
+
+    Returns:
+        [str]: the cache key
+    """
+    data_version = get_depcheck_data_freshness()["last_update"]
+    tool_version = os.path.basename(os.path.dirname(depcheck_home))
+    suppression_digest = get_file_digests(suppression, ("sha1",))["sha1"]
+    return f"{data_version}:{tool_version}:{suppression_digest}"
+
+
+def load_findings_cache(cache_key):
+    """
+    Load the cached findings, dropping them when the key changed.
+
+    Args:
+        cache_key ([str]): the key from get_findings_cache_key
+
+    Returns:
+        [dict]: the report skeleton and the findings keyed by jar sha1
+    """
+    if os.path.exists(DEPCHECK_FINDINGS_CACHE):
+        with open(DEPCHECK_FINDINGS_CACHE, "r") as file:
+            cache = json.load(file)
+        if cache.get("key") == cache_key:
+            return cache
+        main_logger.info("Vulnerability data, tool or suppressions changed, dropping cached findings")
+    return {"key": cache_key, "skeleton": {}, "findings": {}}
+
+
+def save_findings_cache(cache):
+    """
+    Save the findings cache.
+
+    Args:
+        cache ([dict]): the cache from load_findings_cache
+    """
+    os.makedirs(os.path.dirname(DEPCHECK_FINDINGS_CACHE), exist_ok=True)
+    with open(f"{DEPCHECK_FINDINGS_CACHE}.tmp", "w") as file:
+        json.dump(cache, file)
+    os.replace(f"{DEPCHECK_FINDINGS_CACHE}.tmp", DEPCHECK_FINDINGS_CACHE)
+
+
+def group_dependencies_by_jar(report, scan_dir):
+    """
+    Group the dependencies of a Dependency-Check JSON report by the scanned
+    jar they were found in, embedded dependencies included. A dependency is
+    also listed under the jars of its related dependencies, the jars
+    Dependency-Check folded into it, with their own file name and digests.
+    The paths are compared resolved too, Dependency-Check may report them
+    canonicalized.
+
+    Args:
+        report ([dict]): the Dependency-Check JSON report
+        scan_dir ([str]): the directory that was scanned
+
+    Raises:
+        Exception: a dependency is outside of the scanned directory
+
+    Returns:
+        [dict]: dependencies keyed by jar file name
+    """
+
+    def _get_jar(file_path):
+        relative_path = os.path.relpath(file_path, scan_dir)
+        if relative_path.startswith(os.pardir):
+            relative_path = os.path.relpath(os.path.realpath(file_path), os.path.realpath(scan_dir))
+        if relative_path.startswith(os.pardir):
+            raise Exception(f"{file_path} is outside of the scanned directory {scan_dir}")
+        return relative_path.split(os.sep)[0]
+
+    dependencies = {}
+    for dependency in report.get("dependencies", []):
+        jar = _get_jar(dependency["filePath"])
+        dependencies.setdefault(jar, []).append(dependency)
+        for related in dependency.get("relatedDependencies", []):
+            if not related.get("filePath"):
+                continue
+            related_jar = _get_jar(related["filePath"])
+            if related_jar == jar:
+                continue
+            copy = {key: value for key, value in dependency.items() if key != "relatedDependencies"}
+            copy.update(
+                {
+                    key: related[key]
+                    for key in ("fileName", "filePath", "md5", "sha1", "sha256")
+                    if key in related
+                }
+            )
+            dependencies.setdefault(related_jar, []).append(copy)
+    return dependencies
+
+
+def get_cvss_html(vulnerability):
+    """
+    Get the CVSS scores and vectors of a vulnerability as HTML.
+
+    Args:
+        vulnerability ([dict]): the vulnerability of the Dependency-Check JSON report
+
+    Returns:
+        [str]: the scores and vectors
+    """
+    parts = []
+    for version, score_key in (("cvssv3", "baseScore"), ("cvssv2", "score")):
+        cvss = vulnerability.get(version)
+        if not cvss:
+            continue
+        vector = cvss.get("vectorString") or "/".join(
+            f"{key}:{value}" for key, value in cvss.items() if key not in (score_key, "vectorString")
+        )
+        parts.append(f"{version.upper()} {cvss.get(score_key, '')}<br><small>{html.escape(vector)}</small>")
+    return "<br>".join(parts)
+
+
+def get_dependency_html(dependency):
+    """
+    Get the section of a vulnerable dependency: its identifiers, evidence,
+    vulnerabilities with their CVSS vectors, CWEs and references, and the
+    suppressed vulnerabilities.
+
+    Args:
+        dependency ([dict]): the dependency of the Dependency-Check JSON report
+
+    Returns:
+        [str]: the section
+    """
+    packages = ", ".join(html.escape(package["id"]) for package in dependency.get("packages", []))
+    evidence = "".join(
+        f"<tr><td>{html.escape(kind)}</td>"
+        + "".join(
+            f"<td>{html.escape(str(item.get(key, '')))}</td>" for key in ("source", "name", "value", "confidence")
+        )
+        + "</tr>"
+        for kind, items in dependency.get("evidenceCollected", {}).items()
+        for item in items
+    )
+    vulnerabilities = "".join(
+        "<tr>"
+        f"<td>{html.escape(vulnerability.get('name', ''))}</td>"
+        f"<td>{html.escape(vulnerability.get('severity', ''))}</td>"
+        f"<td>{get_cvss_html(vulnerability)}</td>"
+        f"<td>{html.escape(', '.join(vulnerability.get('cwes', [])))}</td>"
+        f"<td>{html.escape(vulnerability.get('description', ''))}</td>"
+        "<td>"
+        + "<br>".join(
+            f"<a href='{html.escape(reference.get('url', ''))}'>"
+            f"{html.escape(reference.get('name') or reference.get('url', ''))}</a>"
+            for reference in vulnerability.get("references", [])
+        )
+        + "</td></tr>"
+        for vulnerability in dependency.get("vulnerabilities", [])
+    )
+    suppressed = ", ".join(
+        html.escape(vulnerability.get("name", ""))
+        for vulnerability in dependency.get("suppressedVulnerabilities", [])
+    )
+    return (
+        f"<h2>{html.escape(dependency['fileName'])}</h2>"
+        f"<p>File path: {html.escape(dependency.get('filePath', ''))}"
+        f"<br>SHA1: {html.escape(dependency.get('sha1', ''))}<br>Packages: {packages}</p>"
+        + (f"<p>Suppressed: {suppressed}</p>" if suppressed else "")
+        + "<details><summary>Evidence</summary><table border='1'>"
+        "<tr><th>Type</th><th>Source</th><th>Name</th><th>Value</th><th>Confidence</th></tr>"
+        f"{evidence}</table></details>"
+        "<table border='1'><tr><th>CVE</th><th>Severity</th><th>CVSS</th><th>CWE</th>"
+        f"<th>Description</th><th>References</th></tr>{vulnerabilities}</table>"
+    )
+
+
+def write_depcheck_html(report, path, shard_reports=()):
+    """
+    Write the HTML report of a merged Dependency-Check report, with the same
+    details as the Dependency-Check HTML report for the vulnerable
+    dependencies, since part of the findings come from the cache.
+
+    Args:
+        report ([dict]): the merged Dependency-Check JSON report
+        path ([str]): path of the HTML file
+        shard_reports (tuple, optional): Dependency-Check HTML reports of this run to link. Defaults to ().
+    """
+    dependencies = report.get("dependencies", [])
+    vulnerable = [dependency for dependency in dependencies if dependency.get("vulnerabilities")]
+    count = sum(len(dependency["vulnerabilities"]) for dependency in vulnerable)
+    links = "".join(
+        f"<li><a href='{html.escape(name)}'>{html.escape(name)}</a></li>" for name in shard_reports
+    )
+    with open(path, "w") as file:
+        file.write(
+            "<html><head><title>Dependency-Check Report</title></head><body>"
+            f"<h1>Dependency-Check Report</h1><p>{len(dependencies)} dependencies, "
+            f"{len(vulnerable)} vulnerable, {count} vulnerabilities</p>"
+            + (f"<p>Dependency-Check reports of the jars analysed in this run:</p><ul>{links}</ul>" if links else "")
+            + "".join(get_dependency_html(dependency) for dependency in vulnerable)
+            + "</body></html>"
+        )
+
+
+def split_jars_into_shards(jar_dir, names, shards):
+    """
+    Split the jars into shards of balanced size, biggest jars first.
+
+    Args:
+        jar_dir ([str]): directory of the jars
+        names ([list]): the jar file names to split
+        shards ([int]): number of shards
+
+    Returns:
+        [list]: the jar file names of each non-empty shard
+    """
+    buckets = [{"size": 0, "names": []} for _ in range(max(1, shards))]
+    sizes = {name: os.path.getsize(f"{jar_dir}/{name}") for name in names}
+    for name in sorted(names, key=sizes.get, reverse=True):
+        bucket = min(buckets, key=lambda item: item["size"])
+        bucket["size"] += sizes[name]
+        bucket["names"].append(name)
+    return [bucket["names"] for bucket in buckets if bucket["names"]]
+
+
+def run_depcheck_shard(depcheck_home, jar_dir, names, shard_dir, suppression, data_dir):
+    """
+    Run Dependency-Check on one shard of the jars.
+
+    Args:
+        depcheck_home ([str]): the home directory of the dependency check tool
+        jar_dir ([str]): directory of the jars
+        names ([list]): the jar file names of the shard
+        shard_dir ([str]): working directory of the shard
+        suppression ([str]): path of the suppression file
+        data_dir ([str]): the data directory to read the vulnerabilities from
+
+    Returns:
+        [dict]: the shard report, its dependencies grouped by jar and its timing
+    """
+    start_time = time.time()
+    scan_dir = f"{shard_dir}/jars"
+    os.makedirs(scan_dir)
+    for name in names:
+        os.link(f"{jar_dir}/{name}", f"{scan_dir}/{name}")
+    run_subprocess(
+        f"{depcheck_home}/bin/dependency-check.sh -s {scan_dir} -f HTML -f JSON -o {shard_dir} --suppression {suppression} --data {data_dir} --noupdate"
+    )
+    with open(f"{shard_dir}/dependency-check-report.json", "r") as file:
+        report = json.load(file)
+    return {
+        "report": report,
+        "dependencies": group_dependencies_by_jar(report, scan_dir),
+        "timing": {
+            "jars": len(names),
+            "bytes": sum(os.path.getsize(f"{scan_dir}/{name}") for name in names),
+            "seconds": time.time() - start_time,
+        },
+    }
+
+
+@timer
+@f_logger
+def run_incremental_depcheck(depcheck_home, jar_dir, reports_dir_path, suppression, shards=1):
+    """
+    Run Dependency-Check only on the jars whose sha1 has no cached findings
+    for the current vulnerability data, then merge the cached findings into
+    a report that covers the full jar set and apply the suppressions to it.
+    The jars to analyse can be split into shards of balanced size that run as
+    concurrent Dependency-Check processes. H2 does not allow several processes
+    on one database, so each shard reads its own snapshot of the data dir,
+    and a single shard uses the data dir itself under the exclusive lock so
+    concurrent runs never open it together.
+
+    Args:
+        depcheck_home ([str]): the home directory of the dependency check tool
+        jar_dir ([str]): directory of the jars to check
+        reports_dir_path ([str]): directory to write the reports to
+        suppression ([str]): path of the suppression file
+        shards (int, optional): number of concurrent Dependency-Check processes. Defaults to 1.
+
+    Returns:
+        [dict]: the merged Dependency-Check JSON report
+    """
+    fingerprints = fingerprint_jars(jar_dir)
+    cache = load_findings_cache(get_findings_cache_key(depcheck_home, suppression))
+    changed = [name for name, sha1 in fingerprints.items() if sha1 not in cache["findings"]]
+    main_logger.info(f"{len(changed)} of {len(fingerprints)} jars are new or changed")
+
+    shard_names = split_jars_into_shards(jar_dir, changed, shards) if changed else []
+    shard_reports = []
+    for name in os.listdir(reports_dir_path):
+        if name.startswith(f"{DEPCHECK_REPORT}_shard_"):
+            os.remove(f"{reports_dir_path}/{name}")
+    if shard_names:
+        # a single shard opens the shared H2 database itself, the others read copies
+        exclusive = len(shard_names) == 1
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(jar_dir)) as tmpdir, depcheck_data_lock(exclusive):
+            shard_args = []
+            for index, names in enumerate(shard_names):
+                shard_dir = f"{tmpdir}/shard_{index}"
+                data_dir = DEPCHECK_DATA_DIR
+                if len(shard_names) > 1:
+                    data_dir = f"{shard_dir}/data"
+                    shutil.copytree(
+                        DEPCHECK_DATA_DIR, data_dir, ignore=shutil.ignore_patterns("*.lock")
+                    )
+                shard_args.append((depcheck_home, jar_dir, names, shard_dir, suppression, data_dir))
+            with ThreadPoolExecutor(max_workers=len(shard_args)) as executor:
+                results = list(executor.map(bind_span(lambda item: run_depcheck_shard(*item)), shard_args))
+
+            timings = []
+            for index, result in enumerate(results):
+                for name in shard_names[index]:
+                    # identical jars share a sha1: keep the findings of the copy they are reported under
+                    findings = result["dependencies"].get(name, [])
+                    if findings or fingerprints[name] not in cache["findings"]:
+                        cache["findings"][fingerprints[name]] = findings
+                timings.append(result["timing"])
+                main_logger.info(
+                    f"Shard {index}: {result['timing']['jars']} jars, {result['timing']['bytes'] / 1024 ** 2:.1f} MB in {result['timing']['seconds']:.0f}s"
+                )
+            with open(f"{reports_dir_path}/{DEPCHECK_REPORT}_shards.json", "w") as file:
+                json.dump(timings, file)
+            cache["skeleton"] = {
+                key: value for key, value in results[0]["report"].items() if key != "dependencies"
+            }
+            # keep the Dependency-Check reports of the analysed jars next to the merged one
+            for index in range(len(results)):
+                shard_report = f"{DEPCHECK_REPORT}_shard_{index}.html"
+                shutil.copy(
+                    f"{tmpdir}/shard_{index}/dependency-check-report.html",
+                    f"{reports_dir_path}/{shard_report}",
+                )
+                shard_reports.append(shard_report)
+        save_findings_cache(cache)
+
+    merged = dict(cache["skeleton"])
+    merged["dependencies"] = [
+        dependency for sha1 in fingerprints.values() for dependency in cache["findings"][sha1]
+    ]
+    apply_suppressions(merged, load_suppressions(suppression))
+    with open(f"{reports_dir_path}/{DEPCHECK_REPORT}.json", "w") as file:
+        json.dump(merged, file)
+    write_depcheck_html(merged, f"{reports_dir_path}/{DEPCHECK_REPORT}.html", shard_reports)
+    return merged
+
+
+def get_depcheck_rows(report):
+    """
+    Flatten a Dependency-Check JSON report into one row per vulnerability.
+
+    Args:
+        report ([dict]): the Dependency-Check JSON report
+
+    Returns:
+        [list]: the rows, in DEPCHECK_HEADER_FIELDS order
+    """
+    rows = []
+    for dependency in report.get("dependencies", []):
+        packages = dependency.get("packages") or [{"id": dependency["fileName"]}]
+        for vulnerability in dependency.get("vulnerabilities", []):
+            cvss = vulnerability.get("cvssv3", {}).get("baseScore") or vulnerability.get(
+                "cvssv2", {}
+            ).get("score", "")
+            rows.append(
+                [
+                    packages[0]["id"],
+                    dependency["fileName"],
+                    dependency.get("sha1", ""),
+                    vulnerability.get("name", ""),
+                    vulnerability.get("severity", "").upper(),
+                    cvss,
+                    vulnerability.get("source", ""),
+                    vulnerability.get("description", ""),
+                ]
+            )
+    return rows
+
+
+def get_cve_delta(current, previous):
+    """
+    Get the CVEs that appeared or got resolved since the previous results.
+
+    Args:
+        current ([DataFrame]): the current findings
+        previous ([DataFrame]): the previous findings
+
+    Returns:
+        [dict]: the new and resolved (package, cve) pairs
+    """
+    current_pairs = set(zip(current["Package"], current["Cve"]))
+    previous_pairs = set(zip(previous["Package"], previous["Cve"]))
+    return {
+        "new": sorted(current_pairs - previous_pairs),
+        "resolved": sorted(previous_pairs - current_pairs),
+    }
+
+
+@timer
+@f_logger
+def export_depcheck_results(report, reports_dir_path, previous_dir_path=None):
+    """
+    Export the depcheck results the way the ASoC issues are exported
+    (csv and excel), with an index on CVE, package and severity, and the
+    CVE delta against the previous results.
+
+    Args:
+        report ([dict]): the merged Dependency-Check JSON report
+        reports_dir_path ([str]): directory to write the results to
+        previous_dir_path ([str], optional): directory of the previous results. Defaults to None.
+
+    Returns:
+        [dict]: the CVE delta, None when there are no previous results
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    findings_path = f"{reports_dir_path}/{DEPCHECK_FINDINGS}.csv"
+    with open(findings_path, "w") as file:
+        csv_writer = csv.writer(file)
+        csv_writer.writerow(DEPCHECK_HEADER_FIELDS)
+        csv_writer.writerows(get_depcheck_rows(report))
+
+    main_logger.info("Export to excel...")
+    findings = pd.read_csv(findings_path, keep_default_na=False)
+    findings.to_excel(f"{reports_dir_path}/{DEPCHECK_FINDINGS}.xlsx", index=None, header=True)
+
+    main_logger.info("Indexing the findings...")
+    index = {
+        field: {str(key): rows.tolist() for key, rows in findings.groupby(field).groups.items()}
+        for field in DEPCHECK_INDEX_FIELDS
+    }
+    with open(f"{reports_dir_path}/{DEPCHECK_FINDINGS}_index.json", "w") as file:
+        json.dump(index, file)
+
+    previous_path = f"{previous_dir_path}/{DEPCHECK_FINDINGS}.csv"
+    if previous_dir_path is None or not os.path.exists(previous_path):
+        return None
+    delta = get_cve_delta(findings, pd.read_csv(previous_path, keep_default_na=False))
+    main_logger.info(f"CVE delta: {len(delta['new'])} new, {len(delta['resolved'])} resolved")
+    with open(f"{reports_dir_path}/{DEPCHECK_DELTA}.json", "w") as file:
+        json.dump(delta, file)
+    return delta
@@ -1,16 +1,77 @@
 """ Docker Utils """
+import fcntl
+import io
+import json
 import os
+import re
+import shutil
+import tarfile
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from fnmatch import fnmatch
+
+from constants import (APP_PATH_DICT, APP_URL_DICT, AUTOMATOR_LABEL, DB2_SCAN, DEPCHECK_SCAN,
+                       DEPLOY_HOST, DOWNLOAD_CHUNK_SIZE, ENTITLED_REGISTRY, IMAGE_DISK_BUDGET,
+                       IMAGE_INDEX_FILE, IMAGE_RETENTION_COUNT, IMAGE_RETENTION_MATCH, NETWORK_SCAN,
+                       READINESS_DEADLINE, READINESS_MAX_BACKOFF, READINESS_MIN_BACKOFF,
+                       READINESS_PROBE_TIMEOUT, RT_HTTP_PORT, RT_HTTPS_PORT, RT_PORT_STEP, RT_SCAN,
+                       VOL_SCAN)
+from main_logger import main_logger
+from settings import CACHE_DIR
+from trace_utils import bind_span, trace_span
+from utils import f_logger, get_http_session, timer, timing_collector
 
-import docker
-import requests
+# created on first use, modes that never touch docker do not load the SDK or contact the daemon
+_DOCKER_CLIENT = None
 
-from constants import (DB2_SCAN, DEPCHECK_SCAN, DEPLOY_SERVER,
-                       ENTITLED_REGISTRY, NETWORK_SCAN, RT_SCAN, VOL_SCAN)
-from main_logger import main_logger
-from utils import f_logger, run_subprocess, timer
 
-client = docker.from_env()
+def get_docker_client():
+    """
+    Get the docker client, created from the environment on first use.
+
+    Returns:
+        [docker.DockerClient]: the docker client
+    """
+    global _DOCKER_CLIENT  # pylint: disable=global-statement
+    if _DOCKER_CLIENT is None:
+        import docker  # pylint: disable=import-outside-toplevel
+
+        _DOCKER_CLIENT = docker.from_env()
+    return _DOCKER_CLIENT
+
+
+@contextmanager
+def docker_op(operation):
+    """
+    Record the latency of a docker API operation and trace it as a span.
+
+    Args:
+        operation ([str]): name of the operation
+    """
+    start_time = time.time()
+    try:
+        with trace_span(f"docker {operation}", category="docker"):
+            yield
+    finally:
+        run_time = time.time() - start_time
+        timing_collector.record(f"docker.{operation}", run_time)
+        main_logger.debug(f"docker {operation} took {run_time:.3f}s")
+
+
+def log_docker_op_timings(logger=main_logger):
+    """
+    Log the count and total latency of the docker API operations.
+
+    Args:
+        logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+    """
+    for name, stats in timing_collector.summary().items():
+        if name.startswith("docker."):
+            logger.info(
+                f"{name}: {stats['count']} calls, {stats['total']:.2f}s total, {stats['max']:.2f}s max"
+            )
 
 
 @timer
@@ -20,22 +81,254 @@ def docker_login():
     Login to the registry.
     """
     main_logger.info(f"#### Login to {ENTITLED_REGISTRY} ####")
-    run_subprocess(
-        f"docker login -u {os.environ['ENTITLED_REGISTRY_USER']} -p {os.environ['ENTITLED_REGISTRY_TOKEN']} {ENTITLED_REGISTRY}",
-        logger=main_logger,
-    )
+    with docker_op("login"):
+        get_docker_client().login(
+            username=os.environ["ENTITLED_REGISTRY_USER"],
+            password=os.environ["ENTITLED_REGISTRY_TOKEN"],
+            registry=ENTITLED_REGISTRY,
+            reauth=True,
+        )
 
 
 @timer
 @f_logger
 def docker_logout():
     """
-    Logout of the registry.
+    Logout of the registry. The credentials of docker_login only live in the
+    client, so dropping them from the client is all there is to do.
     """
     main_logger.info(f"#### Logout of {ENTITLED_REGISTRY} ####")
-    run_subprocess(
-        f"docker logout {ENTITLED_REGISTRY}", logger=main_logger,
+    auths = get_docker_client().api._auth_configs.get("auths", {})  # pylint: disable=protected-access
+    auths.pop(ENTITLED_REGISTRY, None)
+
+
+def get_registry_auth(image):
+    """
+    Get the registry credentials for the image.
+
+    Args:
+        image ([str]): the image to pull
+
+    Returns:
+        [dict]: the auth config for the docker SDK, None for other registries
+    """
+    if image.startswith(ENTITLED_REGISTRY):
+        return {
+            "username": os.environ["ENTITLED_REGISTRY_USER"],
+            "password": os.environ["ENTITLED_REGISTRY_TOKEN"],
+        }
+    return None
+
+
+@timer
+@f_logger
+def pull_image(image, logger=main_logger):
+    """
+    Pull the image through the docker SDK.
+
+    Args:
+        image ([str]): the image to pull
+        logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+
+    Returns:
+        [dict]: pull statistics (seconds, bytes, layers, cached_layers)
+    """
+    start_time = time.time()
+    repository, _, tag = image.rpartition(":")
+    if "/" in tag or not repository:
+        repository, tag = image, "latest"
+    layer_sizes = {}
+    cached_layers = set()
+    events = get_docker_client().api.pull(
+        repository, tag=tag, stream=True, decode=True, auth_config=get_registry_auth(image)
+    )
+    for event in events:
+        if "error" in event:
+            raise Exception(event["error"])
+        layer, status = event.get("id"), event.get("status", "")
+        if status == "Already exists":
+            cached_layers.add(layer)
+        elif status == "Downloading":
+            layer_sizes[layer] = event.get("progressDetail", {}).get("total", 0)
+        elif status == "Pulling fs layer":
+            layer_sizes.setdefault(layer, 0)
+    timing_collector.record("docker.pull", time.time() - start_time)
+    stats = {
+        "seconds": time.time() - start_time,
+        "bytes": sum(layer_sizes.values()),
+        "layers": len(layer_sizes) + len(cached_layers),
+        "cached_layers": len(cached_layers),
+    }
+    logger.info(
+        f"Pulled {image}: {stats['bytes'] / 1024 ** 2:.0f} MB in {stats['seconds']:.0f}s ({stats['bytes'] / 1024 ** 2 / max(stats['seconds'], 1e-6):.1f} MB/s), {stats['cached_layers']}/{stats['layers']} layers cached"
     )
+    return stats
+
+
+def start_image_pull(image):
+    """
+    Start pulling the image in the background so the pull overlaps with the
+    scan preparation. The thread is a daemon, so a run that returns early
+    does not wait for the pull.
+
+    Args:
+        image ([str]): the image to pull
+
+    Returns:
+        [Future]: resolves to the pull statistics
+    """
+    future = Future()
+
+    def _pull():
+        try:
+            future.set_result(pull_image(image))
+        except Exception as error:
+            future.set_exception(error)
+
+    threading.Thread(target=_pull, name=f"pull-{image}", daemon=True).start()
+    return future
+
+
+def wait_for_image_pull(image_pull, logger=main_logger):
+    """
+    Wait for the background pull. A failed pull is only logged, docker run
+    will then pull the image itself.
+
+    Args:
+        image_pull ([Future]): the future from start_image_pull
+        logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+
+    Returns:
+        [dict]: pull statistics, None if the pull failed
+    """
+    try:
+        return image_pull.result()
+    except Exception as error:
+        logger.warning(f"Background image pull failed: {error}")
+        return None
+
+
+@contextmanager
+def image_index_lock(exclusive=False):
+    """
+    Lock the image retention index, concurrent runs and pull threads update it.
+
+    Args:
+        exclusive (bool, optional): take the lock exclusively. Defaults to False.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(f"{CACHE_DIR}/{IMAGE_INDEX_FILE}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_image_index():
+    """
+    Load the image retention index, the caller holds image_index_lock.
+
+    Returns:
+        [dict]: image name to the time it was last used
+    """
+    index_path = f"{CACHE_DIR}/{IMAGE_INDEX_FILE}"
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, "r") as file:
+        return json.load(file)
+
+
+def touch_image(image):
+    """
+    Mark the image as used now in the image retention index.
+
+    Args:
+        image ([str]): the image that is being used
+    """
+    index_path = f"{CACHE_DIR}/{IMAGE_INDEX_FILE}"
+    with image_index_lock(exclusive=True):
+        index = load_image_index()
+        index[image] = time.time()
+        with open(f"{index_path}.tmp", "w") as file:
+            json.dump(index, file)
+        os.replace(f"{index_path}.tmp", index_path)
+
+
+def get_docker_disk_usage():
+    """
+    Get the disk space used by the image layers.
+
+    Returns:
+        [int]: size of the layers in bytes
+    """
+    with docker_op("df"):
+        return get_docker_client().df().get("LayersSize", 0)
+
+
+@timer
+@f_logger
+def enforce_image_retention(
+    match=IMAGE_RETENTION_MATCH,
+    keep=IMAGE_RETENTION_COUNT,
+    budget=IMAGE_DISK_BUDGET,
+    logger=main_logger,
+):
+    """
+    Apply the image retention policy instead of removing images after every
+    run. Nothing is removed while the layers are within the budget. Over the
+    budget, only the keep most recently used images matching the name are
+    retained, more of them (least recently used first) are removed while
+    still over the budget, then the dangling images and the volumes created
+    by the automator are pruned. Images used by a container are never removed.
+
+    Args:
+        match ([str], optional): substring of the image names the policy applies to. Defaults to IMAGE_RETENTION_MATCH.
+        keep ([int], optional): number of images to retain. Defaults to IMAGE_RETENTION_COUNT.
+        budget ([int], optional): disk budget of the layers in bytes. Defaults to IMAGE_DISK_BUDGET.
+        logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+    """
+    with image_index_lock():
+        last_used = load_image_index()
+
+    usage = get_docker_disk_usage()
+    if usage <= budget:
+        logger.info(f"Image layers use {usage / 1024 ** 3:.1f} GB of {budget / 1024 ** 3:.1f} GB")
+        return
+
+    with docker_op("list"):
+        in_use = {con.attrs["Image"] for con in get_docker_client().containers.list(all=True)}
+        images = [
+            (max(last_used.get(tag, 0) for tag in image.tags), image.tags[0])
+            for image in get_docker_client().images.list()
+            if any(match in tag for tag in image.tags) and image.id not in in_use
+        ]
+    images.sort(key=lambda item: item[0], reverse=True)
+
+    def _remove(name):
+        try:
+            logger.info(f"Removing image {name}...")
+            with docker_op("rmi"):
+                get_docker_client().images.remove(name, force=True)
+        except Exception as error:
+            logger.warning(error)
+
+    # over budget: keep the most recently used images only
+    for _, name in images[keep:]:
+        _remove(name)
+    retained = images[:keep]
+
+    # then evict the least recently used ones while still over budget
+    usage = get_docker_disk_usage()
+    while retained and usage > budget:
+        _, name = retained.pop()
+        _remove(name)
+        usage = get_docker_disk_usage()
+    with docker_op("prune"):
+        get_docker_client().images.prune(filters={"dangling": True})
+        # only the volumes created by the automator, never the other ones of the host
+        get_docker_client().volumes.prune(filters={"label": AUTOMATOR_LABEL})
+    logger.info(f"Image layers use {get_docker_disk_usage() / 1024 ** 3:.1f} GB after pruning")
 
 
 @timer
@@ -50,7 +343,8 @@ def get_remove_image_list(args):
     Returns:
         [list]: list of images to remove
     """
-    containers = client.containers.list(all=True)
+    with docker_op("list"):
+        containers = get_docker_client().containers.list(all=True)
     return [
         image
         for con in containers
@@ -61,19 +355,81 @@ def get_remove_image_list(args):
 
 @timer
 @f_logger
-def cleanup_helper(cmd):
+def cleanup_helper(operation, *args, **kwargs):
     """
-    Clean up helper to run the command passed by cleanup func
+    Clean up helper to run the docker operation passed by cleanup func
 
     Args:
-        cmd ([str]): the command to to in subprocess
+        operation ([func]): the docker operation to run
     """
     try:
-        run_subprocess(cmd)
+        operation(*args, **kwargs)
     except Exception as error:
         main_logger.warning(error)
 
 
+def remove_container(name):
+    """
+    Force remove the container if it exists.
+
+    Args:
+        name ([str]): the container name
+    """
+    from docker.errors import NotFound  # pylint: disable=import-outside-toplevel
+
+    try:
+        with docker_op("rm"):
+            get_docker_client().containers.get(name).remove(force=True)
+    except NotFound:
+        pass
+
+
+def disconnect_network(network, container):
+    """
+    Force disconnect the container from the network.
+
+    Args:
+        network ([str]): the network name
+        container ([str]): the container name
+    """
+    with docker_op("network disconnect"):
+        get_docker_client().networks.get(network).disconnect(container, force=True)
+
+
+def remove_network(network):
+    """
+    Remove the network.
+
+    Args:
+        network ([str]): the network name
+    """
+    with docker_op("network rm"):
+        get_docker_client().networks.get(network).remove()
+
+
+def create_volume(volume):
+    """
+    Create the volume with the automator label, so the retention policy only
+    prunes the volumes of the automator.
+
+    Args:
+        volume ([str]): the volume name
+    """
+    with docker_op("volume create"):
+        get_docker_client().volumes.create(volume, labels={AUTOMATOR_LABEL: "true"})
+
+
+def remove_volume(volume):
+    """
+    Force remove the volume.
+
+    Args:
+        volume ([str]): the volume name
+    """
+    with docker_op("volume rm"):
+        get_docker_client().volumes.get(volume).remove(force=True)
+
+
 @timer
 @f_logger
 def cleanup(args):
@@ -96,92 +452,269 @@ def cleanup(args):
 
     # disconnect the containers and network
     main_logger.info(f"Disconnecting runtime container {RT_SCAN} from network {NETWORK_SCAN}...")
-    cleanup_helper(f"docker network disconnect -f {NETWORK_SCAN} {RT_SCAN}")
+    cleanup_helper(disconnect_network, NETWORK_SCAN, RT_SCAN)
     main_logger.info(f"Disconnecting db2 container {DB2_SCAN} from network {NETWORK_SCAN}...")
-    cleanup_helper(f"docker network disconnect -f {NETWORK_SCAN} {DB2_SCAN}")
+    cleanup_helper(disconnect_network, NETWORK_SCAN, DB2_SCAN)
 
     # removing runtime container
     main_logger.info(f"Removing runtime container {RT_SCAN}...")
-    cleanup_helper(f"docker rm -f {RT_SCAN}")
+    cleanup_helper(remove_container, RT_SCAN)
 
-    # removing runtime container
-    try:
-        main_logger.info(f"Removing db2 container {DB2_SCAN}...")
-        cleanup_helper(f"docker rm -f {DB2_SCAN}")
-    except Exception as error:
-        main_logger.info(error)
+    # removing db2 container
+    main_logger.info(f"Removing db2 container {DB2_SCAN}...")
+    cleanup_helper(remove_container, DB2_SCAN)
 
-    # removing runtime container
-    try:
-        main_logger.info(f"Removing volume {VOL_SCAN}...")
-        cleanup_helper(f"docker volume rm -f {VOL_SCAN}")
-    except Exception as error:
-        main_logger.info(error)
+    # removing volume
+    main_logger.info(f"Removing volume {VOL_SCAN}...")
+    cleanup_helper(remove_volume, VOL_SCAN)
 
     # removing scan network
-    try:
-        main_logger.info(f"Removing network {NETWORK_SCAN}")
-        run_subprocess(f"docker network rm {NETWORK_SCAN}")
-    except Exception as error:
-        main_logger.info(error)
+    main_logger.info(f"Removing network {NETWORK_SCAN}")
+    cleanup_helper(remove_network, NETWORK_SCAN)
 
-    # removing images
-    for image in remove_images:
-        try:
-            main_logger.info(f"Removing image {image}...")
-            cleanup_helper(f"docker rmi {image}")
-        except Exception as error:
-            main_logger.info(error)
+    # removing images, keeping the recently used ones around
+    enforce_image_retention(match=f"oms-{args.version}-db2")
 
 
 @timer
 @f_logger
 def pre_install_app(rt_name=RT_SCAN):
     """Remove runtime app container and volume"""
-    try:
-        run_subprocess(f"docker rm -f {rt_name}")
-    except Exception as _:
-        pass
+    remove_container(rt_name)
 
 
-@timer
-@f_logger
-def wait_for_deployment():
+def probe_app(app, url, deadline, stop=None):
     """
-    Waiting for the deployment to be ready.
+    Probe the app url with exponential backoff until it answers 200.
+
+    Args:
+        app ([str]): the app name
+        url ([str]): the url to probe
+        deadline ([float]): the time.time() after which probing stops
+        stop ([threading.Event], optional): set to stop probing early. Defaults to None.
+
+    Returns:
+        [tuple]: the app name and the seconds it took to be ready, None if it never got ready
     """
-    while True:
+    start_time = time.time()
+    backoff = READINESS_MIN_BACKOFF
+    session = get_http_session()
+    stop = stop or threading.Event()
+    while time.time() < deadline and not stop.is_set():
         try:
-            res = requests.get(f"{DEPLOY_SERVER}/smcfs/console/login.jsp", timeout=20, verify=False)
+            res = session.get(url, timeout=READINESS_PROBE_TIMEOUT, verify=False)
             if res.status_code == 200:
-                break
+                return app, time.time() - start_time
+            main_logger.debug(f"{app} returned {res.status_code}")
         except Exception as _e:
-            time.sleep(10)
+            main_logger.debug(f"{app} is not reachable yet")
+        stop.wait(min(backoff, max(deadline - time.time(), 0)))
+        backoff = min(backoff * 2, READINESS_MAX_BACKOFF)
+    return app, None
 
 
 @timer
 @f_logger
-def start_app_container(image, rt_name=RT_SCAN, logger=main_logger):
+def wait_for_deployment(app_urls=None, on_ready=None, timeout=READINESS_DEADLINE):
+    """
+    Waiting for the deployment to be ready. All of the app urls are probed
+    concurrently, and on_ready is called for each app as soon as it is ready
+    so its scan does not wait for the slower apps. An on_ready failure only
+    affects its app, the failures are raised once all the apps are done.
+
+    Args:
+        app_urls ([dict], optional): app name to url to probe. Defaults to APP_URL_DICT.
+        on_ready ([func], optional): called with (app, url) when an app is ready. Defaults to None.
+        timeout ([int], optional): overall deadline in seconds. Defaults to READINESS_DEADLINE.
+
+    Raises:
+        Exception: none of the apps got ready before the deadline, or on_ready failed for some apps
+
+    Returns:
+        [dict]: seconds it took each app to be ready, None for the apps that never got ready
+    """
+    app_urls = APP_URL_DICT if app_urls is None else app_urls
+    deadline = time.time() + timeout
+    ready_times = {}
+    errors = {}
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=len(app_urls)) as executor:
+        futures = [
+            executor.submit(bind_span(probe_app), app, url, deadline, stop) for app, url in app_urls.items()
+        ]
+        try:
+            for future in as_completed(futures):
+                app, ready_time = future.result()
+                ready_times[app] = ready_time
+                if ready_time is None:
+                    main_logger.warning(f"{app} was not ready after {timeout}s")
+                    continue
+                main_logger.info(f"{app} ready in {ready_time:.0f}s")
+                if on_ready:
+                    try:
+                        on_ready(app, app_urls[app])
+                    except Exception as error:
+                        main_logger.error(f"{app} is ready but handling it failed: {error}")
+                        errors[app] = error
+        finally:
+            # do not leave the executor shutdown waiting on the deadline
+            stop.set()
+    if errors:
+        raise Exception(f"Handling the ready apps failed for {', '.join(errors)}: {errors}")
+    if all(ready_time is None for ready_time in ready_times.values()):
+        raise Exception(f"Deployment was not ready after {timeout}s")
+    return ready_times
+
+
+def get_runtime_shards(shards=1, rt_name=RT_SCAN, port_offset=0):
+    """
+    Spread the apps over the runtime containers. Each shard gets its own
+    container name, host ports, network and DEPLOY_SERVER-derived app urls.
+    A single shard keeps the historical name, ports and default network.
+
+    Args:
+        shards (int, optional): number of runtime containers. Defaults to 1.
+        rt_name ([str], optional): base name of the runtime containers. Defaults to RT_SCAN.
+        port_offset (int, optional): added to the host ports, so versions can run side by side. Defaults to 0.
+
+    Returns:
+        [list]: the shards, as dicts with name, http_port, https_port, network and app_urls
     """
-    Start the rt container for deployment
+    apps = list(APP_PATH_DICT)
+    shards = max(1, min(shards, len(apps)))
+    runtime_shards = []
+    for index in range(shards):
+        https_port = RT_HTTPS_PORT + port_offset + index * RT_PORT_STEP
+        runtime_shards.append(
+            {
+                "name": rt_name if shards == 1 else f"{rt_name}_{index}",
+                "http_port": RT_HTTP_PORT + port_offset + index * RT_PORT_STEP,
+                "https_port": https_port,
+                "network": None if shards == 1 else f"{rt_name}_{NETWORK_SCAN}_{index}",
+                "app_urls": {
+                    app: f"{DEPLOY_HOST}:{https_port}{APP_PATH_DICT[app]}"
+                    for app in apps[index::shards]
+                },
+            }
+        )
+    return runtime_shards
+
+
+def get_runtime_containers(rt_name=RT_SCAN):
+    """
+    Get the names of the runtime container and its shards.
+
+    Args:
+        rt_name ([str], optional): base name of the runtime containers. Defaults to RT_SCAN.
+
+    Returns:
+        [list]: names of the existing runtime containers
+    """
+    with docker_op("list"):
+        containers = get_docker_client().containers.list(all=True)
+    return [
+        con.name
+        for con in containers
+        if con.name == rt_name or re.fullmatch(f"{re.escape(rt_name)}_[0-9]+", con.name)
+    ]
+
+
+def stream_container_logs(container, logger=main_logger):
+    """
+    Stream the container logs to the logger in the background.
+
+    Args:
+        container ([Container]): the docker SDK container
+        logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+    """
+
+    def _stream():
+        try:
+            for line in container.logs(stream=True, follow=True):
+                logger.debug(f"[{container.name}] {line.decode(errors='replace').rstrip()}")
+        except Exception as error:
+            logger.debug(f"Stopped streaming logs of {container.name}: {error}")
+
+    threading.Thread(target=_stream, name=f"logs-{container.name}", daemon=True).start()
+
+
+@timer
+@f_logger
+def run_app_container(image, shard, logger=main_logger):
+    """
+    Run the rt container of a shard.
+
+    Args:
+        image ([str]): the image to run
+        shard ([dict]): the shard from get_runtime_shards
+        logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+
+    Returns:
+        [Container]: the started container
+    """
+    configs_dir = f"{os.getcwd()}/app_configs"
+    rt_name = shard["name"]
+    pre_install_app(rt_name)
+    touch_image(image)
+    if shard["network"]:
+        cleanup_helper(remove_network, shard["network"])
+        with docker_op("network create"):
+            get_docker_client().networks.create(shard["network"])
+    logger.info(f"#### STARTING RT CONTAINER: {rt_name} - {image} ####")
+    with docker_op("run"):
+        container = get_docker_client().containers.run(
+            image,
+            name=rt_name,
+            detach=True,
+            tty=True,
+            stdin_open=True,
+            network=shard["network"],
+            volumes={
+                f"{configs_dir}/jvm.options": {"bind": "/config/jvm.options", "mode": "rw"},
+                f"{configs_dir}/server.xml.updated": {"bind": "/config/server.xml", "mode": "rw"},
+                f"{configs_dir}/system_overrides.properties.updated": {
+                    "bind": "/config/dropins/smcfs.ear/properties.jar/system_overrides.properties",
+                    "mode": "rw",
+                },
+            },
+            ports={"9080/tcp": shard["http_port"], "9443/tcp": shard["https_port"]},
+        )
+    stream_container_logs(container, logger=logger)
+    return container
+
+
+@timer
+@f_logger
+def start_app_container(
+    image, rt_name=RT_SCAN, logger=main_logger, on_ready=None, shards=1, port_offset=0
+):
+    """
+    Start the rt container(s) for deployment
 
     Args:
         args ([dict]): the arguments passed to the script
         image_tag ([str]): the tag of the image
         logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+        on_ready ([func], optional): called with (app, url) when an app is ready. Defaults to None.
+        shards (int, optional): number of rt containers to spread the apps over. Defaults to 1.
+        port_offset (int, optional): added to the host ports of the containers. Defaults to 0.
 
     Raises:
         Exception: exception raised when spinning up runtime container
+
+    Returns:
+        [list]: the shards that were started
     """
-    configs_dir = f"{os.getcwd()}/app_configs"
     try:
         docker_login()
-        pre_install_app(rt_name)
-        command = f"docker run -dit --name {rt_name} -v {configs_dir}/jvm.options:/config/jvm.options -v {configs_dir}/server.xml.updated:/config/server.xml -v {configs_dir}/system_overrides.properties.updated:/config/dropins/smcfs.ear/properties.jar/system_overrides.properties -p 9080:9080 -p 9443:9443 {image}"
-        logger.info(f"#### STARTING RT CONTAINER: {rt_name} - {image} ####")
-        logger.info(f"Command: {command}")
-        run_subprocess(command, logger=logger)
-        wait_for_deployment()
+        runtime_shards = get_runtime_shards(shards, rt_name, port_offset)
+        for shard in runtime_shards:
+            run_app_container(image, shard, logger=logger)
+        app_urls = {
+            app: url for shard in runtime_shards for app, url in shard["app_urls"].items()
+        }
+        wait_for_deployment(app_urls=app_urls, on_ready=on_ready)
+        return runtime_shards
     except Exception as error:
         logger.warning(error)
         docker_logout()
@@ -206,10 +739,26 @@ def start_depcheck_container(image, rt_name=DEPCHECK_SCAN, logger=main_logger):
     """
     try:
         docker_login()
-        command = f"docker run -dit -e LICENSE=accept -e LANG --privileged -v {VOL_SCAN}:/images --name {rt_name} {image}"
+        pre_install_app(rt_name)
+        touch_image(image)
+        environment = {"LICENSE": "accept"}
+        if "LANG" in os.environ:
+            environment["LANG"] = os.environ["LANG"]
         logger.info(f"#### STARTING RT CONTAINER: {rt_name} - {image} ####")
-        logger.info(f"Command: {command}")
-        run_subprocess(command, logger=logger)
+        create_volume(VOL_SCAN)
+        with docker_op("run"):
+            container = get_docker_client().containers.run(
+                image,
+                name=rt_name,
+                detach=True,
+                tty=True,
+                stdin_open=True,
+                privileged=True,
+                environment=environment,
+                volumes={VOL_SCAN: {"bind": "/images", "mode": "rw"}},
+            )
+        stream_container_logs(container, logger=logger)
+        return container
     except Exception as error:
         logger.warning(error)
         docker_logout()
@@ -218,49 +767,117 @@ def start_depcheck_container(image, rt_name=DEPCHECK_SCAN, logger=main_logger):
         docker_logout()
 
 
+class IterStream(io.RawIOBase):
+    """
+    Raw reader over an iterator of byte chunks, for tarfile stream mode. Reads
+    are served from a view of the current chunk so nothing is copied twice;
+    wrap it in io.BufferedReader.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self.chunks = iter(chunks)
+        self.chunk = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        """Copy the next bytes of the current chunk into buffer, 0 at the end of the stream."""
+        while not self.chunk:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.chunk = memoryview(chunk)
+        size = min(len(buffer), len(self.chunk))
+        buffer[:size] = self.chunk[:size]
+        self.chunk = self.chunk[size:]
+        return size
+
+
+@timer
+@f_logger
+def extract_jars_from_container(container, src, dest, excludes, logger=main_logger):
+    """
+    Extract the jars under the sub-directories of src straight into dest,
+    filtering them while the archive streams out of the container. This
+    mirrors find ./*/ -type f -name "*.jar" with the excludes as -not -path.
+
+    Args:
+        container ([str]): the container name
+        src ([str]): the directory in the container
+        dest ([str]): the local directory to write the jars to
+        excludes ([list]): fnmatch patterns of the paths to skip
+        logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+
+    Returns:
+        [int]: number of jars extracted
+    """
+    start_time = time.time()
+    os.makedirs(dest, exist_ok=True)
+    jar_count, jar_bytes = 0, 0
+    with docker_op("get_archive"):
+        stream, _ = get_docker_client().containers.get(container).get_archive(src)
+        with tarfile.open(fileobj=io.BufferedReader(IterStream(stream)), mode="r|") as tar:
+            for member in tar:
+                path = f"./{member.name.partition('/')[2]}"
+                if (
+                    not member.isfile()
+                    or not path.endswith(".jar")
+                    or path.count("/") < 2
+                    or any(fnmatch(path, pattern) for pattern in excludes)
+                ):
+                    continue
+                with tar.extractfile(member) as jar, open(
+                    f"{dest}/{os.path.basename(path)}", "wb"
+                ) as file:
+                    shutil.copyfileobj(jar, file, DOWNLOAD_CHUNK_SIZE)
+                jar_count += 1
+                jar_bytes += member.size
+    run_time = max(time.time() - start_time, 1e-6)
+    logger.info(
+        f"Extracted {jar_count} jars ({jar_bytes / 1024 ** 2:.1f} MB) from {container} in {run_time:.1f}s ({jar_bytes / 1024 ** 2 / run_time:.1f} MB/s)"
+    )
+    return jar_count
+
+
 @timer
 @f_logger
 def get_image_from_container(container, logger=main_logger):
     """Return the image from a container"""
+    from docker.errors import NotFound  # pylint: disable=import-outside-toplevel
+
     try:
-        _, image = run_subprocess(f'docker inspect --format="{{{{.Config.Image}}}}" {container}')
-        image = image.replace("\n", "")
+        with docker_op("inspect"):
+            image = get_docker_client().containers.get(container).attrs["Config"]["Image"]
         logger.info(f"Container {container} is using image {image}")
         return image
-    except Exception as _:
-        logger.warn(f"Container {container} does not exist")
+    except NotFound:
+        logger.warning(f"Container {container} does not exist")
         return None
 
 
 @timer
 @f_logger
 def cleanup_runtime_container(container, logger=main_logger):
-    """Clean up runtime container"""
-    logger.info(f"Cleaning up runtime container {container}")
-    image = get_image_from_container(container)
+    """
+    Clean up runtime container, with all of its shards. The image is left to
+    the image retention policy.
+    """
+    containers = get_runtime_containers(container)
+    logger.info(f"Cleaning up runtime containers {containers}")
 
-    # Remove the container
-    try:
-        logger.info(f"Removing container {container}")
-        _, out = run_subprocess(f"docker rm -f {container}")
-    except Exception as _:
-        logger.warn(out.replace("\n", ""))
-
-    # Remove the image if needed
-    if container == DEPCHECK_SCAN:
-        tmp_image = get_image_from_container(RT_SCAN)
-    else:
-        tmp_image = get_image_from_container(DEPCHECK_SCAN)
-    if image != tmp_image:
-        try:
-            logger.info(f"Trying to remove image {image}")
-            _, out = run_subprocess(f"docker rmi {image}")
-        except Exception as _:
-            logger.warn(out.replace("\n", ""))
+    # Remove the containers
+    for name in containers:
+        logger.info(f"Removing container {name}")
+        cleanup_helper(remove_container, name)
 
-    # Remove un-used volumes
-    try:
-        logger.info("Removing un-used volumes")
-        run_subprocess("docker network prune -f  2> /dev/null && docker volume prune -f 2> /dev/null")
-    except Exception as _:
-        pass
+    # Keep the image around for the next run unless over the disk budget
+    enforce_image_retention()
+
+    # Remove un-used networks
+    logger.info("Removing un-used networks")
+    with docker_op("network prune"):
+        cleanup_helper(get_docker_client().networks.prune)
+
+    log_docker_op_timings(logger)
@@ -0,0 +1,120 @@
+""" Journal Utils """
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+
+from main_logger import main_logger
+from settings import CACHE_DIR
+
+RUN_STATE_DIR = f"{CACHE_DIR}/run_state"
+
+
+class RunJournal:
+    """
+    Persistent journal of a run, recording which stage of the run and of each
+    project completed, so an interrupted run can be resumed. Only the path is
+    kept on the instance, every access goes through the file under a lock, so
+    the journal can be handed to pool workers.
+    """
+
+    def __init__(self, name):
+        self.path = f"{RUN_STATE_DIR}/{name}.json"
+        self.work_dir = f"{RUN_STATE_DIR}/{name}"
+
+    @contextmanager
+    def _locked(self, write=False):
+        """
+        Lock the journal and load it, writing it back on exit when asked to.
+
+        Args:
+            write (bool, optional): write the journal back. Defaults to False.
+
+        Yields:
+            [dict]: the journal
+        """
+        os.makedirs(RUN_STATE_DIR, exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+            try:
+                journal = {"run": {}, "stages": {}, "projects": {}}
+                if os.path.exists(self.path):
+                    with open(self.path, "r") as file:
+                        journal = json.load(file)
+                yield journal
+                if write:
+                    with open(f"{self.path}.tmp", "w") as file:
+                        json.dump(journal, file, indent=2)
+                    os.replace(f"{self.path}.tmp", self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def start(self, resume, **run_info):
+        """
+        Start a run. The journal is reset unless resuming an unfinished run
+        with the same run info.
+
+        Args:
+            resume ([bool]): resume from the journal
+
+        Returns:
+            [bool]: True if the run is resumed
+        """
+        with self._locked(write=True) as journal:
+            previous = journal["run"]
+            resumed = resume and previous.get("completed") is False
+            if resumed and any(previous.get(key) != value for key, value in run_info.items()):
+                main_logger.warning(f"The journal is for another run ({previous}), starting over")
+                resumed = False
+            if resumed:
+                main_logger.info(f"Resuming the run started at {previous['started']}")
+            else:
+                if resume:
+                    main_logger.info("No unfinished run to resume, starting over")
+                shutil.rmtree(self.work_dir, ignore_errors=True)
+                journal.clear()
+                journal.update(
+                    {
+                        "run": {"started": datetime.now().isoformat(), "completed": False, **run_info},
+                        "stages": {},
+                        "projects": {},
+                    }
+                )
+        os.makedirs(self.work_dir, exist_ok=True)
+        return resumed
+
+    def record(self, stage, project=None, **values):
+        """
+        Record a completed stage of the run, or of a project.
+
+        Args:
+            stage ([str]): the stage
+            project ([str], optional): the project. Defaults to None.
+        """
+        with self._locked(write=True) as journal:
+            stages = journal["stages"] if project is None else journal["projects"].setdefault(project, {})
+            stages[stage] = {"at": datetime.now().isoformat(), **values}
+
+    def get(self, stage, project=None):
+        """
+        Get a completed stage of the run, or of a project.
+
+        Args:
+            stage ([str]): the stage
+            project ([str], optional): the project. Defaults to None.
+
+        Returns:
+            [dict]: the recorded values, None if the stage did not complete
+        """
+        with self._locked() as journal:
+            stages = journal["stages"] if project is None else journal["projects"].get(project, {})
+            return stages.get(stage)
+
+    def complete(self):
+        """Mark the run as completed and remove its work directory."""
+        with self._locked(write=True) as journal:
+            journal["run"]["completed"] = True
+            journal["run"]["finished"] = datetime.now().isoformat()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
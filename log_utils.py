@@ -0,0 +1,217 @@
+""" Log Utils """
+import contextvars
+import fcntl
+import gzip
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+from constants import SUBPROCESS_LOG_INDEX
+from main_logger import main_logger
+
+# the project the pool worker is processing, one at a time per worker
+_PROJECT = None
+# the version a pipeline stage runs, carried to its threads by bind_span
+_VERSION = contextvars.ContextVar("log_version", default="")
+_LOG_SEQ = itertools.count(1)
+
+
+def set_log_project(project):
+    """
+    Tag the records logged by this worker with the project it processes.
+
+    Args:
+        project ([str]): the project, None to stop tagging
+    """
+    global _PROJECT  # pylint: disable=global-statement
+    _PROJECT = project
+
+
+def get_log_project():
+    """
+    Get the project this worker processes.
+
+    Returns:
+        [str]: the project, None outside of a project
+    """
+    return _PROJECT
+
+
+def set_log_version(version_tag):
+    """
+    Set the version the logs of the current stage belong to.
+
+    Args:
+        version_tag ([str]): the version, empty for a single version run
+    """
+    _VERSION.set(version_tag)
+
+
+def get_log_version():
+    """
+    Get the version the logs of the current stage belong to.
+
+    Returns:
+        [str]: the version, empty for a single version run
+    """
+    return _VERSION.get()
+
+
+class ProjectFilter(logging.Filter):
+    """Add the project of the worker to the records."""
+
+    def filter(self, record):
+        record.project = _PROJECT
+        return True
+
+
+class ProjectFileHandler(logging.Handler):
+    """
+    Write the records tagged with a project to the log file of the project.
+    Only used by the listener thread, the files are opened on first use.
+    """
+
+    def __init__(self, log_dir, level=logging.NOTSET):
+        super().__init__(level)
+        self.log_dir = log_dir
+        self.files = {}
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(funcName)s(): %(message)s"))
+
+    def emit(self, record):
+        project = getattr(record, "project", None)
+        if not project:
+            return
+        if project not in self.files:
+            self.files[project] = logging.FileHandler(f"{self.log_dir}/{project}.log")
+            self.files[project].setFormatter(self.formatter)
+        self.files[project].emit(record)
+
+    def close(self):
+        for file_handler in self.files.values():
+            file_handler.close()
+        self.files.clear()
+        super().close()
+
+
+def init_worker_logging(queue, version_tag=""):
+    """
+    Pool initializer: send the records of the worker to the listener of the
+    main process instead of formatting and writing them in the worker.
+
+    Args:
+        queue ([multiprocessing.Queue]): the queue the listener reads
+        version_tag ([str], optional): the version the worker runs. Defaults to "".
+    """
+    set_log_version(version_tag)
+    for handler in list(main_logger.handlers):
+        main_logger.removeHandler(handler)
+    queue_handler = QueueHandler(queue)
+    queue_handler.addFilter(ProjectFilter())
+    main_logger.addHandler(queue_handler)
+
+
+@contextmanager
+def queue_logging(log_dir=None):
+    """
+    Run a listener that formats and writes the records of the pool workers
+    with the handlers of main_logger, and to a log file per project when a
+    log directory is given. Pass the queue to init_worker_logging.
+
+    Args:
+        log_dir ([str], optional): directory of the project log files. Defaults to None.
+
+    Yields:
+        [multiprocessing.Queue]: the queue of the workers
+    """
+    queue = multiprocessing.Queue(-1)
+    handlers = list(main_logger.handlers)
+    project_handler = None
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        project_handler = ProjectFileHandler(log_dir)
+        handlers.append(project_handler)
+    listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        yield queue
+    finally:
+        listener.stop()
+        if project_handler:
+            project_handler.close()
+        queue.close()
+
+
+def open_compressed_log(path):
+    """
+    Open a log file compressed while it is written, with zstd when zstandard
+    is installed, gzip otherwise.
+
+    Args:
+        path ([str]): path of the log, without the compression suffix
+
+    Returns:
+        [tuple]: the text file and its path
+    """
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return gzip.open(f"{path}.gz", "wt", encoding="utf-8"), f"{path}.gz"
+    return zstandard.open(f"{path}.zst", "wt", encoding="utf-8"), f"{path}.zst"
+
+
+class SubprocessLog:
+    """
+    Compressed log of the whole output of a command, in the directory of the
+    project being processed. Written by the stream reader threads, listed in
+    the index of the log directory once closed.
+    """
+
+    def __init__(self, log_dir, command):
+        self.log_dir = log_dir
+        self.command = command
+        self.project = get_log_project()
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", command)[:60]
+        path = f"{log_dir}/{self.project or 'main'}/{os.getpid()}-{next(_LOG_SEQ)}-{slug}.log"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file, self.path = open_compressed_log(path)
+        self.lines = 0
+        self.lock = threading.Lock()
+
+    def write(self, line):
+        """
+        Write a line of output. Lines coming after the log is closed are dropped.
+
+        Args:
+            line ([str]): the line
+        """
+        with self.lock:
+            if self.file:
+                self.file.write(line + "\n")
+                self.lines += 1
+
+    def close(self, **result):
+        """
+        Close the log and add it to the index.
+
+        Args:
+            result ([dict]): what to record about the run of the command
+        """
+        with self.lock:
+            if not self.file:
+                return
+            self.file.close()
+            self.file = None
+        entry = {"command": self.command, "log": self.path, "project": self.project, "lines": self.lines}
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(f"{self.log_dir}/{SUBPROCESS_LOG_INDEX}", "a") as index_file:
+            fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                index_file.write(json.dumps({**entry, **result}) + "\n")
+            finally:
+                fcntl.flock(index_file, fcntl.LOCK_UN)
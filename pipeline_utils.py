@@ -0,0 +1,218 @@
+""" Pipeline Utils """
+import functools
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from constants import PIPELINE_WORKERS
+from main_logger import main_logger
+from trace_utils import bind_span, trace_span
+
+
+class Pipeline:
+    """
+    Stages declared with their dependencies, run by a bounded thread pool as
+    soon as their dependencies are done. A failed stage skips the stages that
+    depend on it, the independent ones still run.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+
+    def add(self, name, func, *args, deps=(), **kwargs):
+        """
+        Add a stage.
+
+        Args:
+            name ([str]): name of the stage
+            func ([func]): the function to run, with the remaining args and kwargs
+            deps (tuple, optional): names of the stages to wait for. Defaults to ().
+
+        Raises:
+            Exception: a dependency is not a stage of the pipeline
+        """
+        for dep in deps:
+            if dep not in self.stages:
+                raise Exception(f"Unknown dependency {dep} of stage {name}")
+        self.stages[name] = {
+            "func": functools.partial(func, *args, **kwargs),
+            "deps": list(deps),
+            "status": "pending",
+            "start": None,
+            "end": None,
+            "result": None,
+            "error": None,
+        }
+
+    def result(self, name):
+        """
+        Get the result of a finished stage.
+
+        Args:
+            name ([str]): name of the stage
+
+        Returns:
+            [any]: what the stage returned
+        """
+        return self.stages[name]["result"]
+
+    def _run_stage(self, name):
+        """
+        Run a stage in a worker thread.
+
+        Args:
+            name ([str]): name of the stage
+
+        Returns:
+            [any]: what the stage returned
+        """
+        with trace_span(name, category="stage"):
+            return self.stages[name]["func"]()
+
+    def _get_ready_stages(self):
+        """
+        Skip the pending stages with a failed or skipped dependency and get the
+        ones with all of their dependencies done.
+
+        Returns:
+            [list]: names of the stages ready to run
+        """
+        changed = True
+        while changed:
+            changed = False
+            for name, stage in self.stages.items():
+                if stage["status"] == "pending" and any(
+                    self.stages[dep]["status"] in ("failed", "skipped") for dep in stage["deps"]
+                ):
+                    main_logger.warning(f"Pipeline {self.name}: skipping {name}, a dependency failed")
+                    stage["status"] = "skipped"
+                    changed = True
+        return [
+            name
+            for name, stage in self.stages.items()
+            if stage["status"] == "pending"
+            and all(self.stages[dep]["status"] == "done" for dep in stage["deps"])
+        ]
+
+    def run(self, max_workers=PIPELINE_WORKERS):
+        """
+        Run the stages.
+
+        Args:
+            max_workers ([int], optional): stages running at the same time. Defaults to PIPELINE_WORKERS.
+
+        Raises:
+            Exception: one or more stages failed
+
+        Returns:
+            [dict]: what each stage returned
+        """
+        start_time = time.time()
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                for name in self._get_ready_stages():
+                    self.stages[name]["status"] = "running"
+                    self.stages[name]["start"] = time.time() - start_time
+                    running[executor.submit(bind_span(self._run_stage), name)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = self.stages[running.pop(future)]
+                    stage["end"] = time.time() - start_time
+                    try:
+                        stage["result"] = future.result()
+                        stage["status"] = "done"
+                    except Exception as error:
+                        stage["status"] = "failed"
+                        stage["error"] = str(error)
+                        main_logger.warning(
+                            "".join(traceback.format_exception(type(error), error, error.__traceback__))
+                        )
+        self.log_report()
+        failed = [name for name, stage in self.stages.items() if stage["status"] == "failed"]
+        if failed:
+            raise Exception(f"Pipeline {self.name}: stages failed: {', '.join(failed)}")
+        return {name: stage["result"] for name, stage in self.stages.items()}
+
+    def get_critical_path(self):
+        """
+        Get the chain of stages that determined the run time: from the stage
+        that finished last, follow the dependency that finished last.
+
+        Returns:
+            [list]: names of the stages on the critical path, in run order
+        """
+        finished = [name for name, stage in self.stages.items() if stage["end"] is not None]
+        if not finished:
+            return []
+        name = max(finished, key=lambda stage_name: self.stages[stage_name]["end"])
+        path = [name]
+        while True:
+            deps = [dep for dep in self.stages[name]["deps"] if self.stages[dep]["end"] is not None]
+            if not deps:
+                break
+            name = max(deps, key=lambda stage_name: self.stages[stage_name]["end"])
+            path.append(name)
+        return path[::-1]
+
+    def get_report(self):
+        """
+        Get the pipeline report.
+
+        Returns:
+            [dict]: status, start, end and duration of each stage, the critical path and the total time
+        """
+        stages = {
+            name: {
+                "status": stage["status"],
+                "deps": stage["deps"],
+                "start": stage["start"],
+                "end": stage["end"],
+                "duration": None if stage["end"] is None else stage["end"] - stage["start"],
+                "error": stage["error"],
+            }
+            for name, stage in self.stages.items()
+        }
+        ends = [stage["end"] for stage in self.stages.values() if stage["end"] is not None]
+        return {
+            "pipeline": self.name,
+            "total": max(ends, default=0),
+            "critical_path": self.get_critical_path(),
+            "stages": stages,
+        }
+
+    def log_report(self, logger=main_logger):
+        """
+        Log the stages and the critical path.
+
+        Args:
+            logger ([logging], optional): the logger to log the output. Defaults to main_logger.
+        """
+        report = self.get_report()
+        for name, stage in report["stages"].items():
+            if stage["duration"] is None:
+                logger.info(f"PIPELINE {self.name}: {name} {stage['status']}")
+            else:
+                logger.info(
+                    f"PIPELINE {self.name}: {name} {stage['status']} {stage['start']:.1f}s -> {stage['end']:.1f}s ({stage['duration']:.1f}s)"
+                )
+        critical_path = " -> ".join(
+            f"{name} ({report['stages'][name]['duration']:.1f}s)" for name in report["critical_path"]
+        )
+        logger.info(f"PIPELINE {self.name}: {report['total']:.1f}s, critical path: {critical_path}")
+
+    def write_report(self, path):
+        """
+        Write the pipeline report as JSON.
+
+        Args:
+            path ([str]): path of the report
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.get_report(), file, indent=2)
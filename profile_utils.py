@@ -0,0 +1,85 @@
+""" Profile Utils """
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+
+from constants import PROFILE_TOP_ALLOCATIONS, PROFILE_TOP_FUNCTIONS
+from main_logger import main_logger
+
+# tracemalloc is process wide and cProfile profilers conflict, so the
+# profiled stages run one at a time even when started from several threads
+_PROFILE_LOCK = threading.Lock()
+
+
+def write_profile(profiler, snapshot, peak, path):
+    """
+    Write the cProfile stats and the top allocations of a stage.
+
+    Args:
+        profiler ([cProfile.Profile]): the stopped profiler
+        snapshot ([tracemalloc.Snapshot]): the memory snapshot at the end of the stage
+        peak ([int]): peak traced memory in bytes
+        path ([str]): path of the profile, without extension
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    profiler.dump_stats(f"{path}.prof")
+    stats_stream = io.StringIO()
+    pstats.Stats(profiler, stream=stats_stream).sort_stats("cumulative").print_stats(
+        PROFILE_TOP_FUNCTIONS
+    )
+    with open(f"{path}.txt", "w") as file:
+        file.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MB\n\n")
+        file.write(f"Top {PROFILE_TOP_ALLOCATIONS} allocations still alive at the end of the stage:\n")
+        for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+            file.write(f"{stat}\n")
+        file.write("\n")
+        file.write(stats_stream.getvalue())
+
+
+def profile_stage(func):
+    """
+    Record the cProfile stats and tracemalloc top allocations of a top-level
+    stage when --profile is set, into reports/<date>/profile/<stage>.prof and
+    <stage>.txt. The stage must take the script arguments first. Only the
+    calling thread is profiled, not the pool workers. Profiled stages started
+    from several threads, like the exports of watch, wait for each other.
+
+    Args:
+        func ([func]): the stage to be wrapped
+
+    Returns:
+        [func]: return the profile wrapper for the passed in stage
+    """
+
+    @functools.wraps(func)
+    def wrapper(args, *f_args, **kwargs):
+        if not getattr(args, "profile", False):
+            return func(args, *f_args, **kwargs)
+
+        name = "_".join([func.__name__] + [arg for arg in f_args if isinstance(arg, str)])
+        with _PROFILE_LOCK:
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return func(args, *f_args, **kwargs)
+            finally:
+                profiler.disable()
+                snapshot = tracemalloc.take_snapshot().filter_traces(
+                    [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+                )
+                _, peak = tracemalloc.get_traced_memory()
+                if started_tracemalloc:
+                    tracemalloc.stop()
+                path = f"reports/{args.date_str}/profile/{name}"
+                write_profile(profiler, snapshot, peak, path)
+                main_logger.info(f"PROFILE {name}: peak {peak / 1024 / 1024:.1f} MB, written to {path}.prof/.txt")
+
+    return wrapper
@@ -0,0 +1,172 @@
+""" Registry Utils """
+import copy
+import json
+import string
+
+from constants import (ALL, APP_REGISTRY_FILE, DYNAMIC, REGISTRY_LATEST_IMAGE,
+                       REGISTRY_RELEASED_IMAGE, RT_SCAN, SCAN, SINGLE, SINGLE_DYNAMIC,
+                       SINGLE_STATIC, STATIC)
+from main_logger import main_logger
+from utils import f_logger, get_latest_image, get_latest_released_image, timer
+
+SOURCE_PATH_KEYS = ("source", "source_working", "workspace")
+
+
+def load_app_registry(path=APP_REGISTRY_FILE):
+    """
+    Load the app registry, which maps each version to its ASoC app ids,
+    source paths, image and runtime port offset.
+
+    Args:
+        path ([str], optional): path of the registry. Defaults to APP_REGISTRY_FILE.
+
+    Returns:
+        [dict]: the registry entries keyed by version
+    """
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def get_versions_args(args, registry=None):
+    """
+    Get the arguments of each version to run. Each version gets a copy of the
+    arguments with its registry entry applied; the single stream applications
+    and the source paths passed on the command line are used when the entry
+    has none. When several versions run together, their reports, uploads,
+    runtime containers and stage names are kept apart by version, and their
+    scans must not share an application or a static source path.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+        registry ([dict], optional): the app registry. Defaults to the registry file.
+
+    Raises:
+        Exception: a version is not in the registry, or its scans share an application or a source path
+
+    Returns:
+        [list]: the arguments of each version
+    """
+    registry = load_app_registry() if registry is None else registry
+    versions = getattr(args, "versions", None) or [getattr(args, "version", None) or SINGLE]
+    multiple = len(versions) > 1
+    versions_args = []
+    for version in versions:
+        if version not in registry:
+            raise Exception(f"Version {version} is not in {APP_REGISTRY_FILE}")
+        entry = registry[version]
+        version_args = copy.copy(args)
+        version_args.version = version
+        version_args.static_app_id = entry.get("static_app_id") or SINGLE_STATIC
+        version_args.dynamic_app_id = entry.get("dynamic_app_id") or SINGLE_DYNAMIC
+        for path_key in SOURCE_PATH_KEYS:
+            setattr(version_args, path_key, get_version_path(args, version, entry.get(path_key), path_key))
+        version_args.projects_file = entry.get("projects_file", "projects.list")
+        version_args.image = entry.get("image", REGISTRY_LATEST_IMAGE)
+        version_args.port_offset = entry.get("port_offset", 0) if multiple else 0
+        version_args.rt_name = f"{RT_SCAN}_{version}" if multiple else RT_SCAN
+        version_args.version_tag = version if multiple else ""
+        if multiple:
+            version_args.timestamp = f"{args.timestamp}/{version}"
+        versions_args.append(version_args)
+    if multiple and getattr(args, "mode", None) == SCAN:
+        check_app_ids(versions_args, getattr(args, "type", None))
+        if getattr(args, "type", None) in (ALL, STATIC):
+            check_static_paths(versions_args)
+    main_logger.info(f"Versions to run: {versions}")
+    return versions_args
+
+
+def get_version_path(args, version, path, path_key):
+    """
+    Get a source path of the version. The registry path can use the paths
+    passed on the command line and the version, e.g. {workspace}/{version};
+    the command line path is used when the registry has none. The path is
+    skipped when a command line path it uses was not passed.
+
+    Args:
+        args ([dict]): the arguments passed to the script
+        version ([str]): the version
+        path ([str]): the path in the registry entry, None if it has none
+        path_key ([str]): source, source_working or workspace
+
+    Returns:
+        [str]: the path, None if there is none
+    """
+    cli_paths = {key: getattr(args, key, None) for key in SOURCE_PATH_KEYS}
+    if not path:
+        return cli_paths[path_key]
+    fields = {field for _, field, _, _ in string.Formatter().parse(path) if field}
+    missing = sorted(field for field in fields - {"version"} if cli_paths.get(field) is None)
+    if missing:
+        main_logger.info(f"No {path_key} for version {version}: {path} needs {', '.join(missing)}")
+        return None
+    return path.format(version=version, **cli_paths)
+
+
+def check_app_ids(versions_args, scan_type):
+    """
+    Check that the scans of the versions do not go to the same application:
+    each version removes the old scans of its application before scanning.
+
+    Args:
+        versions_args ([list]): the arguments of each version
+        scan_type ([str]): the scan type run
+
+    Raises:
+        Exception: several versions scan into the same application
+    """
+    for app_id_key, app_type in (("static_app_id", STATIC), ("dynamic_app_id", DYNAMIC)):
+        if scan_type not in (ALL, app_type):
+            continue
+        versions_by_app_id = {}
+        for version_args in versions_args:
+            versions_by_app_id.setdefault(getattr(version_args, app_id_key), []).append(version_args.version)
+        for app_id, versions in versions_by_app_id.items():
+            if len(versions) > 1:
+                raise Exception(
+                    f"Versions {versions} share the {app_type} application {app_id}, "
+                    f"set a {app_id_key} per version in {APP_REGISTRY_FILE}"
+                )
+
+
+def check_static_paths(versions_args):
+    """
+    Check that the static scans of the versions do not share a source path:
+    they build, clean and clone into it at the same time.
+
+    Args:
+        versions_args ([list]): the arguments of each version
+
+    Raises:
+        Exception: several versions resolve to the same source path
+    """
+    for path_key in SOURCE_PATH_KEYS:
+        versions_by_path = {}
+        for version_args in versions_args:
+            versions_by_path.setdefault(getattr(version_args, path_key), []).append(version_args.version)
+        for path, versions in versions_by_path.items():
+            if path and len(versions) > 1:
+                raise Exception(
+                    f"Versions {versions} share the {path_key} {path}, "
+                    f"set a {path_key} per version in {APP_REGISTRY_FILE}"
+                )
+
+
+@timer
+@f_logger
+def get_version_image(args):
+    """
+    Get the image of the version: the latest build, the latest released
+    image or the image set in the registry.
+
+    Args:
+        args ([dict]): the arguments of the version
+
+    Returns:
+        [str]: the image
+    """
+    if args.image == REGISTRY_LATEST_IMAGE:
+        return get_latest_image()
+    if args.image == REGISTRY_RELEASED_IMAGE:
+        return get_latest_released_image()
+    return args.image
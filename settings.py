@@ -1,6 +1,6 @@
 """ Settings """
 import os
-from os.path import dirname, join
+from os.path import dirname, expanduser, join
 
 from dotenv import load_dotenv
 
@@ -11,3 +11,9 @@ load_dotenv(dotenv_path)
 JFROG_APIKEY = os.environ.get("JFROG_APIKEY")
 JENKINS_TAAS_TOKEN = os.environ.get("JENKINS_TAAS_TOKEN")
 APPSCAN_HOME = os.environ.get("APPSCAN_HOME")
+CACHE_DIR = os.environ.get("AUTOMATOR_CACHE_DIR", join(expanduser("~"), ".cache", "appscan-automator"))
+
+# lines of a command output that still go to the main logger, the whole output is in its log file
+SUBPROCESS_LOG_HEAD = int(os.environ.get("AUTOMATOR_SUBPROCESS_LOG_HEAD", "20"))
+SUBPROCESS_LOG_TAIL = int(os.environ.get("AUTOMATOR_SUBPROCESS_LOG_TAIL", "20"))
+SUBPROCESS_FAILURE_EXCERPT = int(os.environ.get("AUTOMATOR_SUBPROCESS_FAILURE_EXCERPT", "50"))
@@ -0,0 +1,76 @@
+""" Startup Benchmark
+
+Guard against CLI startup regressions: import automator in fresh interpreters
+and fail when the median import time is over the budget or when a module that
+must be imported lazily is loaded at import time.
+
+    python startup_benchmark.py [--runs 5] [--budget 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from constants import STARTUP_BENCHMARK_RUNS, STARTUP_IMPORT_BUDGET, STARTUP_LAZY_MODULES
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import automator
+run_time = time.perf_counter() - start
+loaded = [name for name in {STARTUP_LAZY_MODULES!r} if name in sys.modules]
+print(json.dumps({{"time": run_time, "loaded": loaded}}))
+"""
+
+
+def measure_import(runs):
+    """
+    Import automator in fresh interpreters.
+
+    Args:
+        runs ([int]): number of interpreters to start
+
+    Returns:
+        [tuple]: the import times and the lazy modules that were loaded
+    """
+    times, loaded = [], set()
+    for _ in range(runs):
+        res = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(res.stdout.strip().splitlines()[-1])
+        times.append(result["time"])
+        loaded.update(result["loaded"])
+    return times, sorted(loaded)
+
+
+def main():
+    """
+    Main
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the automator.")
+    parser.add_argument("--runs", type=int, default=STARTUP_BENCHMARK_RUNS)
+    parser.add_argument("--budget", type=float, default=STARTUP_IMPORT_BUDGET)
+    args = parser.parse_args()
+
+    times, loaded = measure_import(args.runs)
+    median = statistics.median(times)
+    print(f"import automator: median {median:.3f}s, min {min(times):.3f}s over {args.runs} runs")
+    failed = False
+    if loaded:
+        print(f"FAIL: loaded at import time: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget:
+        print(f"FAIL: median import time is over the {args.budget:.3f}s budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
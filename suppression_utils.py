@@ -0,0 +1,302 @@
+""" Suppression Utils """
+import re
+import xml.etree.ElementTree as ET
+from datetime import date
+
+from constants import SUPPRESSION_NS
+from main_logger import main_logger
+from utils import f_logger, timer
+
+# the elements that select the dependency of a suppression
+DEPENDENCY_SELECTORS = ["filePath", "sha1", "gav", "packageUrl"]
+
+
+def compile_pattern(text, regex, case_sensitive=False):
+    """
+    Compile a suppression value once. Like Dependency-Check, the pattern has
+    to match the whole value and the case is ignored unless caseSensitive is set.
+
+    Args:
+        text ([str]): the value of the element
+        regex ([bool]): the value is a regular expression
+        case_sensitive (bool, optional): the caseSensitive attribute. Defaults to False.
+
+    Returns:
+        [Pattern]: the compiled pattern, to use with fullmatch
+    """
+    return re.compile(text if regex else re.escape(text), 0 if case_sensitive else re.IGNORECASE)
+
+
+def cpe_prefix(cpe):
+    """
+    Convert a cpe 2.2 uri (cpe:/a:vendor:product) to its cpe 2.3 prefix.
+
+    Args:
+        cpe ([str]): the cpe
+
+    Returns:
+        [str]: the cpe 2.3 prefix
+    """
+    return cpe.replace("cpe:/", "cpe:2.3:", 1) if cpe.startswith("cpe:/") else cpe
+
+
+@timer
+@f_logger
+def load_suppressions(path):
+    """
+    Parse the suppression file and compile its patterns once.
+
+    Args:
+        path ([str]): path of the suppression file
+
+    Returns:
+        [list]: the suppressions, as dicts
+    """
+    suppressions = []
+    for element in ET.parse(path).getroot():
+        suppression = {
+            "notes": "",
+            "until": element.get("until"),
+            "base": element.get("base", "false") == "true",
+            "selector": None,
+            "cves": [],
+            "cpes": [],
+            "names": [],
+            "cvss_below": [],
+            "error": None,
+        }
+        for child in element:
+            tag = child.tag.split("}")[-1]
+            text = (child.text or "").strip()
+            regex = child.get("regex", "false") == "true"
+            case_sensitive = child.get("caseSensitive", "false") == "true"
+            if tag == "notes":
+                suppression["notes"] = text
+            elif tag in DEPENDENCY_SELECTORS:
+                suppression["selector"] = (tag, text, regex, case_sensitive)
+            elif tag == "cve":
+                suppression["cves"].append(text)
+            elif tag == "cpe":
+                suppression["cpes"].append(text)
+            elif tag == "vulnerabilityName":
+                suppression["names"].append((text, regex, case_sensitive))
+            elif tag == "cvssBelow":
+                suppression["cvss_below"].append(float(text))
+        try:
+            if suppression["selector"]:
+                suppression["pattern"] = compile_pattern(*suppression["selector"][1:])
+            suppression["name_patterns"] = [compile_pattern(*name) for name in suppression["names"]]
+        except re.error as error:
+            suppression["error"] = f"invalid regex: {error}"
+        suppressions.append(suppression)
+    return suppressions
+
+
+@timer
+@f_logger
+def merge_suppressions(suppressions):
+    """
+    Merge the suppressions that select the same dependencies, e.g. one entry
+    per CVE for the same gav becomes a single entry with all of the CVEs.
+
+    Args:
+        suppressions ([list]): the suppressions from load_suppressions
+
+    Returns:
+        [list]: the merged suppressions
+    """
+    merged = {}
+    for suppression in suppressions:
+        key = (suppression["selector"], suppression["until"], suppression["base"])
+        if key not in merged:
+            merged[key] = {**suppression, "cves": [], "cpes": [], "names": [], "cvss_below": []}
+            merged[key]["notes"] = []
+        target = merged[key]
+        for field in ("cves", "cpes", "names", "cvss_below"):
+            target[field] += [value for value in suppression[field] if value not in target[field]]
+        if suppression["notes"] and suppression["notes"] not in target["notes"]:
+            target["notes"].append(suppression["notes"])
+    for suppression in merged.values():
+        suppression["notes"] = "\n\n".join(suppression["notes"])
+        suppression["name_patterns"] = [compile_pattern(*name) for name in suppression["names"]]
+    main_logger.info(f"Merged {len(suppressions)} suppressions into {len(merged)}")
+    return list(merged.values())
+
+
+@timer
+@f_logger
+def write_suppressions(suppressions, path):
+    """
+    Write the suppressions to a suppression file.
+
+    Args:
+        suppressions ([list]): the suppressions to write
+        path ([str]): path of the suppression file
+    """
+    ET.register_namespace("", SUPPRESSION_NS)
+    root = ET.Element(f"{{{SUPPRESSION_NS}}}suppressions")
+    for suppression in suppressions:
+        element = ET.SubElement(root, f"{{{SUPPRESSION_NS}}}suppress")
+        if suppression["until"]:
+            element.set("until", suppression["until"])
+        if suppression["base"]:
+            element.set("base", "true")
+        ET.SubElement(element, f"{{{SUPPRESSION_NS}}}notes").text = suppression["notes"]
+        if suppression["selector"]:
+            tag, text, regex, case_sensitive = suppression["selector"]
+            selector = ET.SubElement(element, f"{{{SUPPRESSION_NS}}}{tag}")
+            selector.text = text
+            if regex:
+                selector.set("regex", "true")
+            if case_sensitive:
+                selector.set("caseSensitive", "true")
+        for cpe in suppression["cpes"]:
+            ET.SubElement(element, f"{{{SUPPRESSION_NS}}}cpe").text = cpe
+        for cve in suppression["cves"]:
+            ET.SubElement(element, f"{{{SUPPRESSION_NS}}}cve").text = cve
+        for text, regex, case_sensitive in suppression["names"]:
+            name = ET.SubElement(element, f"{{{SUPPRESSION_NS}}}vulnerabilityName")
+            name.text = text
+            if regex:
+                name.set("regex", "true")
+            if case_sensitive:
+                name.set("caseSensitive", "true")
+        for score in suppression["cvss_below"]:
+            ET.SubElement(element, f"{{{SUPPRESSION_NS}}}cvssBelow").text = str(score)
+    tree = ET.ElementTree(root)
+    ET.indent(tree, space="\t")
+    tree.write(path, encoding="UTF-8", xml_declaration=True)
+
+
+def get_dependency_keys(dependency):
+    """
+    Get the values of a dependency the suppression selectors match against.
+
+    Args:
+        dependency ([dict]): a dependency of the Dependency-Check JSON report
+
+    Returns:
+        [dict]: the values keyed by selector
+    """
+    purls = [package["id"] for package in dependency.get("packages", [])]
+    gavs = []
+    for purl in purls:
+        if purl.startswith("pkg:maven/"):
+            coordinates = purl[len("pkg:maven/") :].split("?")[0]
+            group_artifact, _, version = coordinates.partition("@")
+            gavs.append(f"{group_artifact.replace('/', ':')}:{version}")
+    return {
+        "filePath": [dependency.get("filePath", "")],
+        "sha1": [dependency.get("sha1", "")],
+        "gav": gavs,
+        "packageUrl": purls,
+    }
+
+
+def is_suppressed(suppression, dependency_cpes, vulnerability):
+    """
+    Check if the suppression applies to a vulnerability of a selected dependency.
+
+    Args:
+        suppression ([dict]): the suppression
+        dependency_cpes ([list]): the cpe identifiers of the dependency
+        vulnerability ([dict]): the vulnerability
+
+    Returns:
+        [bool]: True if the vulnerability is suppressed
+    """
+    name = vulnerability.get("name", "")
+    if name in suppression["cves"]:
+        return True
+    if any(pattern.fullmatch(name) for pattern in suppression["name_patterns"]):
+        return True
+    score = vulnerability.get("cvssv3", {}).get("baseScore") or vulnerability.get("cvssv2", {}).get("score")
+    if score is not None and any(score < limit for limit in suppression["cvss_below"]):
+        return True
+    return any(
+        cpe.startswith(cpe_prefix(suppressed_cpe))
+        for suppressed_cpe in suppression["cpes"]
+        for cpe in dependency_cpes
+    )
+
+
+@timer
+@f_logger
+def apply_suppressions(report, suppressions):
+    """
+    Apply the suppressions to a Dependency-Check JSON report locally. The
+    already suppressed vulnerabilities are re-evaluated too, so the result
+    only reflects the given suppressions.
+
+    Args:
+        report ([dict]): the Dependency-Check JSON report, updated in place
+        suppressions ([list]): the suppressions from load_suppressions
+
+    Returns:
+        [dict]: usage per suppression index, with the matched dependencies and suppressed vulnerabilities
+    """
+    today = date.today().isoformat()
+    active = [
+        (index, suppression)
+        for index, suppression in enumerate(suppressions)
+        if not suppression["error"] and (not suppression["until"] or suppression["until"][:10] >= today)
+    ]
+    usage = {index: {"dependencies": 0, "vulnerabilities": 0} for index in range(len(suppressions))}
+    for dependency in report.get("dependencies", []):
+        keys = get_dependency_keys(dependency)
+        dependency_cpes = [
+            identifier["id"]
+            for identifier in dependency.get("vulnerabilityIds", [])
+            if identifier.get("id", "").startswith("cpe:")
+        ]
+        selected = [
+            (index, suppression)
+            for index, suppression in active
+            if suppression["selector"] is None
+            or any(suppression["pattern"].fullmatch(value) for value in keys[suppression["selector"][0]])
+        ]
+        for index, _ in selected:
+            usage[index]["dependencies"] += 1
+        vulnerabilities, suppressed = [], []
+        for vulnerability in dependency.get("vulnerabilities", []) + dependency.get(
+            "suppressedVulnerabilities", []
+        ):
+            matches = [
+                index
+                for index, suppression in selected
+                if is_suppressed(suppression, dependency_cpes, vulnerability)
+            ]
+            for index in matches:
+                usage[index]["vulnerabilities"] += 1
+            (suppressed if matches else vulnerabilities).append(vulnerability)
+        dependency["vulnerabilities"] = vulnerabilities
+        dependency["suppressedVulnerabilities"] = suppressed
+    return usage
+
+
+def get_suppression_issues(suppressions, usage):
+    """
+    Find the suppressions that do nothing. Dead ones select no dependency at
+    all (or are expired/invalid), unused ones select dependencies but none of
+    their vulnerabilities.
+
+    Args:
+        suppressions ([list]): the suppressions from load_suppressions
+        usage ([dict]): the usage from apply_suppressions
+
+    Returns:
+        [dict]: the dead and unused suppressions, as short descriptions
+    """
+    today = date.today().isoformat()
+    issues = {"dead": [], "unused": []}
+    for index, suppression in enumerate(suppressions):
+        description = f"#{index} {suppression['selector']} {suppression['cves'] + [name for name, *_ in suppression['names']] + suppression['cpes']}"
+        if suppression["error"]:
+            issues["dead"].append(f"{description}: {suppression['error']}")
+        elif suppression["until"] and suppression["until"][:10] < today:
+            issues["dead"].append(f"{description}: expired {suppression['until']}")
+        elif usage[index]["dependencies"] == 0:
+            issues["dead"].append(f"{description}: matches no dependency")
+        elif usage[index]["vulnerabilities"] == 0:
+            issues["unused"].append(f"{description}: suppresses nothing")
+    return issues
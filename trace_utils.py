@@ -0,0 +1,211 @@
+""" Trace Utils """
+import contextvars
+import functools
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# forked pool workers inherit the trace directory through the environment
+TRACE_DIR_ENV = "AUTOMATOR_TRACE_DIR"
+
+_local = threading.local()
+_counter = itertools.count()
+_lock = threading.Lock()
+_files = {}
+
+
+def _reset_after_fork():
+    """Drop the lock and the trace file handles inherited from the parent."""
+    global _lock  # pylint: disable=global-statement
+    _lock = threading.Lock()
+    _files.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_stack():
+    """
+    Get the span stack of the current thread.
+
+    Returns:
+        [list]: the ids of the open spans, innermost last
+    """
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_span_id():
+    """
+    Get the id of the innermost open span of the current thread.
+
+    Returns:
+        [str]: the span id, None if there is no open span
+    """
+    stack = _get_stack()
+    return stack[-1] if stack else None
+
+
+def _write_event(event):
+    """
+    Append a trace event to the trace file of the current process.
+
+    Args:
+        event ([dict]): the Chrome trace event
+    """
+    pid = os.getpid()
+    with _lock:
+        if pid not in _files:
+            _files[pid] = open(  # pylint: disable=consider-using-with
+                f"{os.environ[TRACE_DIR_ENV]}/trace-{pid}.jsonl", "a", buffering=1
+            )
+            process_name = multiprocessing.current_process().name
+            _files[pid].write(
+                json.dumps(
+                    {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": process_name}}
+                )
+                + "\n"
+            )
+        _files[pid].write(json.dumps(event) + "\n")
+
+
+@contextmanager
+def trace_span(name, category="function", parent=None, **span_args):
+    """
+    Trace a span. The parent is the innermost open span of the thread unless
+    given, which is how spans of pool workers are attached to their stage.
+    Nothing is recorded when tracing was not started.
+
+    Args:
+        name ([str]): name of the span
+        category (str, optional): category of the span. Defaults to "function".
+        parent ([str], optional): id of the parent span. Defaults to None.
+
+    Yields:
+        [str]: the span id, None when tracing is off
+    """
+    if TRACE_DIR_ENV not in os.environ:
+        yield None
+        return
+    span_id = f"{os.getpid()}-{next(_counter)}"
+    parent_id = parent if parent is not None else current_span_id()
+    stack = _get_stack()
+    stack.append(span_id)
+    start = time.time_ns() // 1000
+    try:
+        yield span_id
+    finally:
+        stack.pop()
+        _write_event(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start,
+                "dur": time.time_ns() // 1000 - start,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": {"span_id": span_id, "parent_id": parent_id, **span_args},
+            }
+        )
+
+
+def bind_span(func):
+    """
+    Bind the current span to a function that will run in another thread, so
+    its spans are children of the current one. The context variables of the
+    caller are carried over too.
+
+    Args:
+        func ([func]): the function to bind
+
+    Returns:
+        [func]: the bound function
+    """
+    parent = current_span_id()
+    context = contextvars.copy_context()
+
+    def _run(*args, **kwargs):
+        if parent is None:
+            return func(*args, **kwargs)
+        stack = _get_stack()
+        stack.append(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stack.pop()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # a context can only be entered by one thread at a time
+        return context.copy().run(_run, *args, **kwargs)
+
+    return wrapper
+
+
+def install_http_tracing():
+    """
+    Trace every HTTP call made through requests. Only the host and path are
+    recorded, query strings can carry tokens.
+    """
+    import requests  # pylint: disable=import-outside-toplevel
+
+    original = requests.Session.request
+    if getattr(original, "traced", False):
+        return
+
+    @functools.wraps(original)
+    def request(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        with trace_span(f"HTTP {method} {parts.netloc}{parts.path}", category="http"):
+            return original(self, method, url, *args, **kwargs)
+
+    request.traced = True
+    requests.Session.request = request
+
+
+def start_tracing():
+    """
+    Start tracing the run.
+
+    Returns:
+        [str]: the directory the processes write their trace events to
+    """
+    trace_dir = tempfile.mkdtemp(prefix="automator-trace-")
+    os.environ[TRACE_DIR_ENV] = trace_dir
+    install_http_tracing()
+    return trace_dir
+
+
+def export_trace(path):
+    """
+    Stop tracing and merge the trace events of all processes into a Chrome
+    trace-event JSON file (open it in chrome://tracing or Perfetto).
+
+    Args:
+        path ([str]): path of the trace file
+    """
+    trace_dir = os.environ.pop(TRACE_DIR_ENV, None)
+    if trace_dir is None:
+        return
+    with _lock:
+        for file in _files.values():
+            file.close()
+        _files.clear()
+    events = []
+    for trace_file in glob.glob(f"{trace_dir}/trace-*.jsonl"):
+        with open(trace_file, "r") as file:
+            events.extend(json.loads(line) for line in file if line.strip())
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+    shutil.rmtree(trace_dir, ignore_errors=True)
@@ -1,36 +1,177 @@
 """ Utils """
 import errno
 import functools
+import hashlib
+import json
 import logging
 import os
 import re
+import signal
 import subprocess
 import sys
 import tarfile
+import threading
 import time
 import traceback
 import xml.etree.ElementTree as ET
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from math import ceil
 
-import coloredlogs
 import requests
-import yaml
-from bs4 import BeautifulSoup
-from clint.textui import progress
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
 from args import init_argparse
 from constants import (APPSCAN_URL, APPSCAN_ZIP_URL, CASE_INDEX_URL, DEPCHECK,
-                       DEPCHECK_SCAN, JFROG_USER, NS, OWASP_URL, RT_SCAN,
-                       SINGLE_STREAM_RSS_URL, TWISTLOCK_URL)
+                       DOWNLOAD_CHUNK_SIZE, DOWNLOAD_SEGMENT_THRESHOLD, DOWNLOAD_SEGMENTS,
+                       DOWNLOAD_TIMEOUT, HTTP_POOL_SIZE, JFROG_USER, NS, OWASP_URL,
+                       SINGLE_STREAM_RSS_URL, SUBPROCESS_KILL_GRACE, SUBPROCESS_LOGS,
+                       SUBPROCESS_MAX_LINES, TWISTLOCK_URL, UPLOAD_WORKERS)
+from log_utils import SubprocessLog, get_log_version
 from main_logger import main_logger
-from settings import JENKINS_TAAS_TOKEN, JFROG_APIKEY
+from settings import (JENKINS_TAAS_TOKEN, JFROG_APIKEY, SUBPROCESS_FAILURE_EXCERPT,
+                      SUBPROCESS_LOG_HEAD, SUBPROCESS_LOG_TAIL)
+from trace_utils import bind_span, trace_span
+
+_HTTP_SESSIONS = {}
+SECRET_OPTION_PATTERN = re.compile(
+    r"(--(?:nvdApiKey|apiKey|password|token)[= ]+)(?:'[^']*'|\"[^\"]*\"|\S+)", re.IGNORECASE
+)
+
+
+class TimingCollector:
+    """
+    In-process collector of timings, with call counts, totals and percentiles.
+    """
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """
+        Record one timing.
+
+        Args:
+            name ([str]): name of the timed function or operation
+            seconds ([float]): the duration
+        """
+        with self.lock:
+            self.timings[name].append(seconds)
+
+    def summary(self):
+        """
+        Summarize the recorded timings.
+
+        Returns:
+            [dict]: count, total, p50, p90, p99 and max keyed by name, slowest total first
+        """
+
+        def _percentile(values, percent):
+            return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+        with self.lock:
+            timings = {name: sorted(values) for name, values in self.timings.items()}
+        summary = {
+            name: {
+                "count": len(values),
+                "total": sum(values),
+                "p50": _percentile(values, 50),
+                "p90": _percentile(values, 90),
+                "p99": _percentile(values, 99),
+                "max": values[-1],
+            }
+            for name, values in timings.items()
+        }
+        return dict(sorted(summary.items(), key=lambda item: item[1]["total"], reverse=True))
+
+    def drain(self):
+        """
+        Take the recorded timings out of the collector.
+
+        Returns:
+            [dict]: the durations keyed by name
+        """
+        with self.lock:
+            timings, self.timings = dict(self.timings), defaultdict(list)
+        return timings
+
+    def merge(self, timings):
+        """
+        Add the timings recorded by another process.
+
+        Args:
+            timings ([dict]): the durations keyed by name, from drain
+        """
+        with self.lock:
+            for name, values in timings.items():
+                self.timings[name].extend(values)
+
+    def reset(self):
+        """Forget the timings a forked child inherited from its parent."""
+        self.timings = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def dump(self, path):
+        """
+        Dump the summary as JSON.
+
+        Args:
+            path ([str]): path of the JSON file
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+
+timing_collector = TimingCollector()
+os.register_at_fork(after_in_child=timing_collector.reset)
+
+
+def run_timed_task(func, *args):
+    """
+    Run a pool task and hand the timings it recorded back to the parent,
+    which merges them with merge_task_timings. Errors are handed back too,
+    so the timings of a failed task are not lost.
+
+    Args:
+        func ([func]): the task, run with the remaining args
+
+    Returns:
+        [tuple]: what the task returned, the error it raised (None if it did not) and its timings
+    """
+    try:
+        return func(*args), None, timing_collector.drain()
+    except Exception as error:
+        return None, error, timing_collector.drain()
+
+
+def merge_task_timings(task_result):
+    """
+    Merge the timings of a task run by run_timed_task and raise its error.
+
+    Args:
+        task_result ([tuple]): what run_timed_task returned
+
+    Raises:
+        Exception: the error raised by the task
+
+    Returns:
+        [any]: what the task returned
+    """
+    result, error, timings = task_result
+    timing_collector.merge(timings)
+    if error:
+        raise error
+    return result
 
 
 def f_logger(func):
     """
-    Print the function signature and return value.
+    Print the function signature and return value. The arguments and the
+    return value are only formatted when DEBUG logging is enabled.
 
     Args:
         func ([func]): the function to be wrapped
@@ -41,22 +182,27 @@ def f_logger(func):
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        log_info = main_logger.isEnabledFor(logging.INFO)
         try:
-            args_repr = [repr(a) for a in args]
-            kwargs_repr = [f"{k}={v!r}" for k, v in kwargs.items()]
-            signature = ", ".join(args_repr + kwargs_repr)
-            main_logger.info(f"START - {func.__name__}")
-            main_logger.debug(f"{func.__name__}({signature})")
+            if log_info:
+                main_logger.info(f"START - {func.__name__}")
+            if main_logger.isEnabledFor(logging.DEBUG):
+                args_repr = [repr(a) for a in args]
+                kwargs_repr = [f"{k}={v!r}" for k, v in kwargs.items()]
+                signature = ", ".join(args_repr + kwargs_repr)
+                main_logger.debug(f"{func.__name__}({signature})")
             value = func(*args, **kwargs)
-            main_logger.debug(f"{func.__name__!r} returned {value!r}")
+            if main_logger.isEnabledFor(logging.DEBUG):
+                main_logger.debug(f"{func.__name__!r} returned {value!r}")
             return value
         except Exception as error:
             main_logger.error(traceback.format_exc())
             main_logger.error(f"ERROR - {func.__name__} : {error}")
             raise
         finally:
-            main_logger.info(f"END - {func.__name__}")
-            sys.stdout.flush()
+            if log_info:
+                main_logger.info(f"END - {func.__name__}")
+                sys.stdout.flush()
 
     return wrapper
 
@@ -85,7 +231,8 @@ def get_run_duration(run_time):
 
 def timer(func):
     """
-    Print the runtime of the decorated function.
+    Print the runtime of the decorated function, record it in the timing
+    collector and trace it as a span.
 
     Args:
         func ([func]): the function to be wrapped
@@ -93,23 +240,73 @@ def timer(func):
     Returns:
         [func]: return the timer wrapper for the passed in function
     """
+    name = f"{func.__module__}.{func.__qualname__}"
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        value = func(*args, **kwargs)
-        end_time = time.time()
-        run_time = end_time - start_time
-        hours, minutes, seconds = get_run_duration(run_time)
-        main_logger.info(f"{func.__name__}() completed in: {hours}h {minutes}m {seconds}s")
-        return value
+        start_time = time.perf_counter()
+        try:
+            with trace_span(func.__name__):
+                return func(*args, **kwargs)
+        finally:
+            run_time = time.perf_counter() - start_time
+            timing_collector.record(name, run_time)
+            if main_logger.isEnabledFor(logging.INFO):
+                hours, minutes, seconds = get_run_duration(run_time)
+                main_logger.info(f"{func.__name__}() completed in: {hours}h {minutes}m {seconds}s")
 
     return wrapper
 
 
+def kill_process_group(pid, grace=SUBPROCESS_KILL_GRACE):
+    """
+    Terminate the process group of the child, then kill it if it is still
+    around after the grace period.
+
+    Args:
+        pid ([int]): pid of the child, which leads its process group
+        grace ([int], optional): seconds between SIGTERM and SIGKILL. Defaults to SUBPROCESS_KILL_GRACE.
+    """
+    try:
+        os.killpg(pid, signal.SIGTERM)
+        deadline = time.time() + grace
+        while time.time() < deadline:
+            os.killpg(pid, 0)
+            time.sleep(0.1)
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _read_stream(stream, lines, on_line, spill=None):
+    """
+    Read the lines of a child stream into a ring buffer.
+
+    Args:
+        stream ([file]): the stdout or stderr pipe of the child
+        lines ([deque]): the ring buffer to keep the last lines in
+        on_line ([func]): called with each decoded line
+        spill ([func], optional): called with each line to write it to the log file. Defaults to None.
+    """
+    encoding = sys.stdout.encoding or "utf-8"
+    for raw_line in iter(stream.readline, b""):
+        line = raw_line.rstrip().decode(encoding, errors="backslashreplace")
+        lines.append(line)
+        if spill:
+            spill(line)
+        if on_line:
+            on_line(line)
+    stream.close()
+
+
 def run_subprocess(command, timeout=None, logger=main_logger):
     """
-    Run the subprocess.
+    Run the subprocess. stdout and stderr are read concurrently, only their
+    last lines are kept in memory, the timeout kills the whole process group
+    and the CPU time and max RSS of the child are recorded. The whole output
+    goes to a compressed log file per command, listed in the index of the
+    subprocess logs; only the first and last lines of stdout and an excerpt
+    on failure are logged.
 
     Args:
         command ([str]): the command to run subprocess
@@ -118,35 +315,156 @@ def run_subprocess(command, timeout=None, logger=main_logger):
 
     Raises:
         Exception: exception raised when running subprocess
+        subprocess.TimeoutExpired: the subprocess did not finish within the timeout
 
     Returns:
         [tuple]: the return value and output of the subprocess
     """
-    popen = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    lines_iterator = iter(popen.stdout.readline, b"")
-    output = ""
-    while popen.poll() is None:
-        for line in lines_iterator:
-            nline = line.rstrip()
-            nline = nline.decode(
-                encoding=sys.stdout.encoding,
-                errors="replace" if (sys.version_info) < (3, 5) else "backslashreplace",
-            )
-            output += nline + "\n"
-            if logger:
-                logger.info(nline)
-            if main_logger.level <= logging.INFO:
-                if not logger:
-                    print(nline, end="\r\n", flush=True)
+    with trace_span(
+        f"subprocess {command.split()[0]}", category="subprocess", command=redact_command(command)[:200]
+    ):
+        subprocess_log = SubprocessLog(get_subprocess_log_dir(get_log_version()), redact_command(command))
+        try:
+            return _run_subprocess(command, timeout, logger, subprocess_log)
+        finally:
+            # already closed with the usage unless the command could not run
+            subprocess_log.close()
+
+
+def redact_command(command):
+    """
+    Mask the values of the secret options of a command, before it is written
+    to the traces or the subprocess logs index.
+
+    Args:
+        command ([str]): the command
+
+    Returns:
+        [str]: the command with the secrets masked
+    """
+    return SECRET_OPTION_PATTERN.sub(r"\1***", command)
+
+
+@functools.lru_cache(maxsize=None)
+def get_subprocess_log_dir(version_tag=""):
+    """
+    Get the directory of the subprocess logs of a version. It is resolved
+    once, so all the logs of a run going past midnight stay together.
+
+    Args:
+        version_tag ([str], optional): the version, empty for a single version run. Defaults to "".
+
+    Returns:
+        [str]: the directory of the subprocess logs
+    """
+    return get_reports_dir(SUBPROCESS_LOGS, version_tag=version_tag)
+
+
+def _log_output_tail(log_line, lines, count, log_path):
+    """
+    Log the last lines of the output that were not logged with the first ones.
+
+    Args:
+        log_line ([func]): called with each line to log
+        lines ([deque]): the last lines of the output
+        count ([int]): number of lines of the output
+        log_path ([str]): the log file with the whole output
+    """
+    skipped = count - SUBPROCESS_LOG_HEAD
+    if skipped <= 0:
+        return
+    tail_size = min(SUBPROCESS_LOG_TAIL, skipped, len(lines))
+    tail = list(lines)[-tail_size:] if tail_size else []
+    log_line(f"... {skipped - len(tail)} more lines in {log_path} ...")
+    for line in tail:
+        log_line(line)
+
+
+def _run_subprocess(command, timeout, logger, subprocess_log):
+    """Run the subprocess, see run_subprocess."""
+    start_time = time.time()
+    popen = subprocess.Popen(
+        command,
+        shell=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    def _print(line):
+        if main_logger.level <= logging.INFO:
+            print(line, end="\r\n", flush=True)
+
+    log_line = logger.info if logger else _print
+    stdout_count = [0]
+
+    def _log_head(line):
+        stdout_count[0] += 1
+        if stdout_count[0] <= SUBPROCESS_LOG_HEAD:
+            log_line(line)
+
+    stdout_lines = deque(maxlen=SUBPROCESS_MAX_LINES)
+    stderr_lines = deque(maxlen=SUBPROCESS_MAX_LINES)
+    readers = [
+        threading.Thread(
+            target=_read_stream,
+            args=(popen.stdout, stdout_lines, _log_head, subprocess_log.write),
+            daemon=True,
+        ),
+        threading.Thread(
+            target=_read_stream,
+            args=(popen.stderr, stderr_lines, None, subprocess_log.write),
+            daemon=True,
+        ),
+    ]
+    for reader in readers:
+        reader.start()
+
+    # reap the child with wait4 so its resource usage comes along
+    result = {}
+
+    def _wait():
+        _, result["status"], result["rusage"] = os.wait4(popen.pid, 0)
+
+    waiter = threading.Thread(target=_wait, daemon=True)
+    waiter.start()
+    waiter.join(timeout)
+    timed_out = waiter.is_alive()
+    if timed_out:
+        main_logger.warning(f"PROCESS: {popen.pid} timed out after {timeout}s, killing it")
+        kill_process_group(popen.pid)
+        waiter.join()
+    # a daemonized grandchild can keep the pipes open, do not wait on it forever
+    readers_deadline = time.time() + SUBPROCESS_KILL_GRACE
+    for reader in readers:
+        reader.join(max(readers_deadline - time.time(), 0))
+    popen.returncode = os.waitstatus_to_exitcode(result["status"])
+
+    usage = {
+        "command": redact_command(command),
+        "returncode": popen.returncode,
+        "wall": time.time() - start_time,
+        "cpu": result["rusage"].ru_utime + result["rusage"].ru_stime,
+        "max_rss_mb": result["rusage"].ru_maxrss / 1024,
+        "log": subprocess_log.path,
+    }
+    subprocess_log.close(**usage, timed_out=timed_out)
+    timing_collector.record(f"subprocess.{command.split()[0]}", usage["wall"])
+    _log_output_tail(log_line, stdout_lines, stdout_count[0], subprocess_log.path)
+    if timed_out:
+        raise subprocess.TimeoutExpired(redact_command(command), timeout, output="\n".join(stdout_lines))
     if logger:
-        logger.info(f"PROCESS: {popen.pid} return {popen.returncode}")
+        logger.info(
+            f"PROCESS: {popen.pid} return {popen.returncode} (wall {usage['wall']:.1f}s, cpu {usage['cpu']:.1f}s, max rss {usage['max_rss_mb']:.0f} MB)"
+        )
         if popen.returncode != 0:
-            _, err = popen.communicate()
-            logger.error(f"ERROR: {err}")
+            # tools writing their errors to stdout leave stderr empty
+            excerpt_lines = list(stderr_lines or stdout_lines)[-SUBPROCESS_FAILURE_EXCERPT:]
+            err = "\n".join(excerpt_lines)
+            logger.error(f"ERROR (whole output in {subprocess_log.path}): {err}")
             raise Exception(err)
-    retval = popen.wait(timeout)
-    subprocess.run(["stty", "sane"])  # pylint: disable=subprocess-run-check
-    return retval, output
+    return popen.returncode, "\n".join(stdout_lines) + "\n"
 
 
 def setup_main_logging(verbose=logging.INFO):
@@ -156,6 +474,8 @@ def setup_main_logging(verbose=logging.INFO):
     Args:
         verbose ([str], optional): the log level ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"). Defaults to logging.INFO.
     """
+    import coloredlogs  # pylint: disable=import-outside-toplevel
+
     coloredlogs.install(
         level=verbose,
         logger=main_logger,
@@ -211,6 +531,8 @@ def get_latest_stable_image_tags():
     Returns:
         [str]: the latest available stable urls
     """
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
     image_tags = []
     stable_build_urls = fetch_available_build_urls(SINGLE_STREAM_RSS_URL)
     for build_url in stable_build_urls:
@@ -296,6 +618,25 @@ def get_date_str():
     return f"{year_month}_week_{week_of_month}"
 
 
+def get_reports_dir(app_type, date_str=None, version_tag=""):
+    """
+    Get the reports directory of a scan type. The version level is only
+    there when several versions run together.
+
+    Args:
+        app_type ([str]): the scan type (or mode)
+        date_str ([str], optional): the date string or "latest". Defaults to today.
+        version_tag ([str], optional): the version, empty for a single version run. Defaults to "".
+
+    Returns:
+        [str]: the reports directory
+    """
+    date_str = date_str or get_date_str()
+    if version_tag:
+        return f"reports/{date_str}/{version_tag}/{app_type}"
+    return f"reports/{date_str}/{app_type}"
+
+
 @timer
 @f_logger
 def get_files_info_in_zip(zip_file):
@@ -318,61 +659,309 @@ def get_files_info_in_zip(zip_file):
             yield zip_file_info
 
 
-@timer
-@f_logger
-def download(url, filename, context):
+def get_http_session():
     """
-    Download file given the url
+    Get the pooled HTTP session of the current process. Sessions are kept
+    per PID so forked pool workers never share sockets with their parent.
+
+    Returns:
+        [requests.Session]: the pooled session
+    """
+    pid = os.getpid()
+    if pid not in _HTTP_SESSIONS:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _HTTP_SESSIONS[pid] = session
+    return _HTTP_SESSIONS[pid]
+
+
+def get_file_digests(path, algorithms=("sha256",)):
+    """
+    Compute the digests of a file in a single pass.
 
     Args:
-        url (str): file url
-        filename (str): filename to save
-        context (str): directory to save file to
+        path ([str]): path to the file
+        algorithms (tuple, optional): hashlib algorithm names. Defaults to ("sha256",).
+
+    Returns:
+        [dict]: hex digest keyed by algorithm name
     """
+    digests = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b""):
+            for digest in digests.values():
+                digest.update(block)
+    return {algorithm: digest.hexdigest() for algorithm, digest in digests.items()}
+
+
+def _get_download_validator(headers):
+    """
+    Get the validator identifying the version of the remote file, to send in
+    If-Range so a resumed download never mixes two versions of the file.
+
+    Args:
+        headers ([dict]): headers of the HEAD response
+
+    Returns:
+        [str]: the strong ETag, else the Last-Modified date, None if there is neither
+    """
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("last-modified")
+
+
+def _load_download_state(part_path):
+    """
+    Load what is known of the part file: the validator of the remote file it
+    was started from and, for a segmented download, the finished ranges.
+
+    Args:
+        part_path ([str]): path of the partial file
+
+    Returns:
+        [dict]: the state, empty if there is no part file or no state
+    """
+    state_path = f"{part_path}.state"
+    if not os.path.exists(part_path) or not os.path.exists(state_path):
+        return {}
     try:
-        res = requests.get(url, stream=True, auth=get_auth(url))
-        main_logger.info(f"Download {filename} returned {res.status_code}")
-        if res.status_code != 200:
-            return False
-        total_length = int(res.headers.get("content-length"))
-        with open(f"{context}/{filename}", "wb") as file:
-            total_length = int(res.headers.get("content-length"))
-            for chunk in progress.bar(
-                res.iter_content(chunk_size=1024),
-                expected_size=(total_length / 1024) + 1,
-                label="Downloading. Please wait >>> ",
-            ):
-                if chunk:
-                    file.write(chunk)
-                    file.flush()
-        return True
-    except Exception as error:
-        main_logger.earning(error)
-        raise
+        with open(state_path) as state_file:
+            return json.load(state_file)
+    except ValueError:
+        return {}
+
+
+def _save_download_state(part_path, state):
+    """
+    Save the state of the part file, replacing the previous one atomically.
+
+    Args:
+        part_path ([str]): path of the partial file
+        state ([dict]): the state
+    """
+    with open(f"{part_path}.state.tmp", "w") as state_file:
+        json.dump(state, state_file)
+    os.replace(f"{part_path}.state.tmp", f"{part_path}.state")
+
+
+def _remove_download_state(part_path, remove_part=False):
+    """
+    Remove the state of the part file, and the part file itself if asked.
+
+    Args:
+        part_path ([str]): path of the partial file
+        remove_part (bool, optional): remove the part file too. Defaults to False.
+    """
+    for path in [f"{part_path}.state"] + ([part_path] if remove_part else []):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _download_stream(session, url, part_path, validator, auth):
+    """
+    Stream the file into the part file, resuming from its current size when
+    it was started from the same version of the remote file.
+
+    Args:
+        session ([requests.Session]): the pooled session
+        url ([str]): file url
+        part_path ([str]): path of the partial file
+        validator ([str]): ETag or Last-Modified of the remote file, None if unknown
+        auth ([tuple]): the request auth
+
+    Returns:
+        [int]: size of the part file, None if the server refused the request
+    """
+    state = _load_download_state(part_path)
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {}
+    if offset and validator and state == {"validator": validator}:
+        headers = {"Range": f"bytes={offset}-", "If-Range": validator}
+    elif offset:
+        main_logger.info(f"{os.path.basename(part_path)} is not from the current remote file, starting over")
+        offset = 0
+    with session.get(
+        url, stream=True, auth=auth, headers=headers, timeout=DOWNLOAD_TIMEOUT
+    ) as res:
+        main_logger.info(f"Download {os.path.basename(part_path)} returned {res.status_code}")
+        if res.status_code == 416:
+            # the part file does not match the remote file anymore, start over
+            _remove_download_state(part_path, remove_part=True)
+            return _download_stream(session, url, part_path, validator, auth)
+        if res.status_code not in (200, 206):
+            return None
+        if res.status_code == 200:
+            # a full response to a ranged request means the remote file changed
+            offset = 0
+        if not offset:
+            _remove_download_state(part_path)
+            if validator:
+                _save_download_state(part_path, {"validator": validator})
+        with open(part_path, "ab" if offset else "wb", buffering=DOWNLOAD_CHUNK_SIZE) as file:
+            for chunk in res.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+                offset += len(chunk)
+    return offset
+
+
+def _download_segment(session, url, part_path, start, end, validator, auth):
+    """
+    Download one byte range of the file into its place in the part file.
+
+    Args:
+        session ([requests.Session]): the pooled session
+        url ([str]): file url
+        part_path ([str]): path of the preallocated partial file
+        start ([int]): first byte of the range
+        end ([int]): last byte of the range (inclusive)
+        validator ([str]): ETag or Last-Modified of the remote file, None if unknown
+        auth ([tuple]): the request auth
+
+    Returns:
+        [int]: number of bytes written, None if the server did not honor the range
+    """
+    headers = {"Range": f"bytes={start}-{end}"}
+    if validator:
+        headers["If-Range"] = validator
+    written = 0
+    with session.get(
+        url, stream=True, auth=auth, headers=headers, timeout=DOWNLOAD_TIMEOUT
+    ) as res:
+        if res.status_code != 206:
+            main_logger.warning(f"Range {start}-{end} of {url} returned {res.status_code}")
+            return None
+        with open(part_path, "r+b", buffering=DOWNLOAD_CHUNK_SIZE) as file:
+            file.seek(start)
+            for chunk in res.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+                written += len(chunk)
+    return written
+
+
+def _download_segments(session, url, part_path, total_length, segments, validator, auth):
+    """
+    Download the file as parallel ranged segments. The finished ranges are
+    saved next to the part file, so an interrupted download only fetches the
+    missing ones on the next call.
+
+    Args:
+        session ([requests.Session]): the pooled session
+        url ([str]): file url
+        part_path ([str]): path of the partial file
+        total_length ([int]): size of the remote file
+        segments ([int]): number of segments
+        validator ([str]): ETag or Last-Modified of the remote file, None if unknown
+        auth ([tuple]): the request auth
+
+    Returns:
+        [int]: number of bytes written, None if the server refused a range
+    """
+    segment_size = ceil(total_length / segments)
+    ranges = [
+        (start, min(start + segment_size, total_length) - 1)
+        for start in range(0, total_length, segment_size)
+    ]
+    state = _load_download_state(part_path)
+    if (
+        validator
+        and state.get("validator") == validator
+        and state.get("length") == total_length
+        and os.path.getsize(part_path) == total_length
+    ):
+        state["done"] = [segment for segment in state.get("done", []) if tuple(segment) in ranges]
+    else:
+        _remove_download_state(part_path)
+        with open(part_path, "wb") as file:
+            file.truncate(total_length)
+        # without a validator the finished ranges cannot be trusted on the next call
+        state = {"validator": validator, "length": total_length, "done": []}
+        if validator:
+            _save_download_state(part_path, state)
+    done = {tuple(segment) for segment in state["done"]}
+    missing = [segment for segment in ranges if segment not in done]
+    if done:
+        main_logger.info(f"Resuming {os.path.basename(part_path)}: {len(missing)}/{len(ranges)} segments missing")
+    state_lock = threading.Lock()
+
+    def _fetch(start, end):
+        written = _download_segment(session, url, part_path, start, end, validator, auth)
+        if written is not None and validator:
+            with state_lock:
+                state["done"].append([start, end])
+                _save_download_state(part_path, state)
+        return written
+
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [executor.submit(bind_span(_fetch), start, end) for start, end in missing]
+        written = [future.result() for future in futures]
+    if None in written:
+        # the remote file changed or ranges are refused: start over on the next call
+        _remove_download_state(part_path, remove_part=True)
+        return None
+    return sum(written)
 
 
 @timer
 @f_logger
-def cleanup():
+def download(url, filename, context, checksum=None, segments=DOWNLOAD_SEGMENTS):
     """
-    Cleaning up
-    """
-    try:
-        run_subprocess(f"docker rm -f {RT_SCAN} 2> /dev/null")
-    except Exception as _:
-        main_logger.warning(f"Error removing {RT_SCAN} 2> /dev/null")
+    Download file given the url. The file is streamed in large chunks to a
+    ``.part`` file which is renamed once complete, so an interrupted download
+    resumes with an HTTP Range request on the next call. The request carries
+    If-Range so a remote file changed in between is downloaded again. Big
+    files are fetched as parallel ranged segments when the server accepts
+    ranges, and only the missing segments are fetched again on resume.
 
-    try:
-        run_subprocess(f"docker rm -f {DEPCHECK_SCAN} 2> /dev/null ")
-    except Exception as _:
-        main_logger.warning(f"Error removing {DEPCHECK_SCAN} 2> /dev/null")
+    Args:
+        url (str): file url
+        filename (str): filename to save
+        context (str): directory to save file to
+        checksum (tuple, optional): (algorithm, hex digest) to verify the file. Defaults to None.
+        segments (int, optional): parallel segments for big files. Defaults to DOWNLOAD_SEGMENTS.
+
+    Raises:
+        Exception: the downloaded file does not match the checksum
 
+    Returns:
+        [bool]: True if the file was downloaded, False otherwise
+    """
+    path = f"{context}/{filename}"
+    part_path = f"{path}.part"
+    auth = get_auth(url)
+    session = get_http_session()
     try:
-        run_subprocess(
-            "docker network prune -f  2> /dev/null && docker volume prune -f 2> /dev/null"
+        start_time = time.time()
+        head = session.head(url, auth=auth, allow_redirects=True, timeout=DOWNLOAD_TIMEOUT)
+        total_length = int(head.headers.get("content-length") or 0) if head.ok else 0
+        accept_ranges = head.ok and head.headers.get("accept-ranges") == "bytes"
+        validator = _get_download_validator(head.headers) if head.ok else None
+        if accept_ranges and segments > 1 and total_length >= DOWNLOAD_SEGMENT_THRESHOLD:
+            size = _download_segments(session, url, part_path, total_length, segments, validator, auth)
+        else:
+            size = _download_stream(session, url, part_path, validator, auth)
+        if size is None:
+            return False
+
+        if checksum is not None:
+            algorithm, expected = checksum
+            actual = get_file_digests(part_path, (algorithm,))[algorithm]
+            if actual != expected.lower():
+                _remove_download_state(part_path, remove_part=True)
+                raise Exception(f"{algorithm} mismatch for {filename}: {actual} != {expected}")
+        os.replace(part_path, path)
+        _remove_download_state(part_path)
+
+        run_time = max(time.time() - start_time, 1e-6)
+        main_logger.info(
+            f"Downloaded {filename}: {size / 1024 ** 2:.1f} MB in {run_time:.1f}s ({size / 1024 ** 2 / run_time:.1f} MB/s)"
         )
-    except Exception as _:
-        pass
+        return True
+    except Exception as error:
+        main_logger.warning(error)
+        raise
 
 
 @timer
@@ -396,6 +985,8 @@ def download_and_extract_appscan(path):
 @f_logger
 def get_latest_image():
     """Get latest built image"""
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
     res = requests.get(
         TWISTLOCK_URL, auth=HTTPBasicAuth(os.environ["JENKINS_USER"], os.environ["JENKINS_TOKEN"])
     )
@@ -415,7 +1006,7 @@ def get_latest_image():
 @timer
 @f_logger
 def update_config_file(file_name):
-    """Update config file"""
+    """Update config file. The file is replaced atomically, so concurrent runs never mount a partial one"""
     with open(file_name, "r") as file:
         data = file.read()
         data = data.replace("__DB_HOST__", os.environ["DB_HOST"])
@@ -424,26 +1015,98 @@ def update_config_file(file_name):
         data = data.replace("__DB_USER__", os.environ["DB_USER"])
         data = data.replace("__DB_PASS__", os.environ["DB_PASS"])
         data = data.replace("__DB_SCHEMA__", os.environ["DB_SCHEMA"])
-    with open(f"{file_name}.updated", "w") as file:
+    with open(f"{file_name}.updated.{os.getpid()}.{threading.get_ident()}", "w") as file:
         file.write(data)
+    os.replace(f"{file_name}.updated.{os.getpid()}.{threading.get_ident()}", f"{file_name}.updated")
+
+
+def upload_file_to_artifactory(session, file_path, target_url, auth):
+    """
+    Upload a file to artifactory. The file is skipped when the target already
+    has the same sha1, and checksum deploy is tried first so that content the
+    server already stores is linked without sending the bytes again.
+
+    Args:
+        session ([requests.Session]): the pooled session
+        file_path ([str]): path of the file to upload
+        target_url ([str]): artifactory url to upload the file to
+        auth ([tuple]): artifactory user and token
+
+    Raises:
+        Exception: exception raised when the upload fails
+
+    Returns:
+        [tuple]: the upload outcome ("skipped", "linked" or "uploaded") and the time it took
+    """
+    with trace_span(f"upload {os.path.basename(file_path)}", category="upload"):
+        start_time = time.time()
+        digests = get_file_digests(file_path, ("sha1", "sha256"))
+        headers = {"X-Checksum-Sha1": digests["sha1"], "X-Checksum-Sha256": digests["sha256"]}
+
+        res = session.head(target_url, auth=auth, timeout=DOWNLOAD_TIMEOUT)
+        if res.status_code == 200 and res.headers.get("X-Checksum-Sha1") == digests["sha1"]:
+            return "skipped", time.time() - start_time
+
+        res = session.put(
+            target_url,
+            auth=auth,
+            headers={**headers, "X-Checksum-Deploy": "true"},
+            timeout=DOWNLOAD_TIMEOUT,
+        )
+        if res.status_code in (200, 201):
+            return "linked", time.time() - start_time
+
+        with open(file_path, "rb") as file:
+            res = session.put(target_url, data=file, auth=auth, headers=headers, timeout=DOWNLOAD_TIMEOUT)
+        if res.status_code not in (200, 201):
+            raise Exception(f"Uploading {file_path} returned {res.status_code}: {res.text}")
+        return "uploaded", time.time() - start_time
 
 
 @timer
 @f_logger
 def upload_reports_to_artifactory(scan_type, report_dir, timestamp):
-    """Upload the reports to artifactory"""
+    """
+    Upload the reports to artifactory.
+
+    Args:
+        scan_type ([str]): type of scan the reports belong to
+        report_dir ([str]): directory of the reports to upload
+        timestamp ([str]): timestamp of the run, used in the upload path
+    """
     upload_url = f"{APPSCAN_URL}/{timestamp}/{scan_type}"
     if scan_type == DEPCHECK:
         upload_url = f"{OWASP_URL}/{timestamp}"
-    run_subprocess(
-        f"cd {report_dir} && for file in $(ls); do curl -u {os.environ['ARTF_USER']}:{os.environ['ARTF_TOKEN']} -T $(realpath $file) {upload_url}/$(basename $file); done"
-    )
+    auth = (os.environ["ARTF_USER"], os.environ["ARTF_TOKEN"])
+    session = get_http_session()
+
+    files = []
+    for root, _, names in os.walk(report_dir):
+        for name in names:
+            file_path = os.path.join(root, name)
+            files.append((file_path, os.path.relpath(file_path, report_dir)))
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                bind_span(upload_file_to_artifactory), session, file_path, f"{upload_url}/{rel_path}", auth
+            ): rel_path
+            for file_path, rel_path in files
+        }
+        for future, rel_path in futures.items():
+            try:
+                outcome, run_time = future.result()
+                main_logger.info(f"{outcome.upper()} {rel_path} in {run_time:.2f}s")
+            except Exception as error:
+                main_logger.warning(error)
 
 
 @timer
 @f_logger
 def get_latest_case_version():
     """Get latest case version"""
+    import yaml  # pylint: disable=import-outside-toplevel
+
     try:
         res = requests.get(CASE_INDEX_URL, allow_redirects=True)
         return yaml.safe_load(res.text)["latestVersion"]
@@ -455,6 +1118,8 @@ def get_latest_case_version():
 @f_logger
 def get_latest_released_image():
     """Get latest case image"""
+    import yaml  # pylint: disable=import-outside-toplevel
+
     case_version = get_latest_case_version()
     case_url = f"https://raw.githubusercontent.com/IBM/cloud-pak/master/repo/case/ibm-oms-ent-case/{case_version}/ibm-oms-ent-case-{case_version}.tgz"
     download(case_url, f"ibm-oms-ent-case-{case_version}.tgz", "./")